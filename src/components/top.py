@@ -504,6 +504,11 @@ class CentralWidget(QtWidgets.QWidget):
         entry_list = self._discList.getDiscEntries()
         settings = self._settingsList.getUserSettings()
 
+        #give new discs their CustomModelData numbers up front and keep
+        #  them in the list, so they stay the same in later generations
+        entry_list.assign_custom_model_data(settings.get('offset', 0))
+        self._discList.setCustomModelData(entry_list)
+
         #launch worker thread to generate packs
         #   FFmpeg conversion is slow, don't want to lock up UI
         self._thread = QtCore.QThread(self)
@@ -607,27 +612,34 @@ class GeneratePackWorker(QtCore.QObject):
         self.emit_update_progress()
         self.valid.emit()
 
-        #process tracks
-        self._generator.create_tmp()
-        self._generator.convert_all_to_ogg(self._entry_list, self._settings, self.emit_update_progress)
+        #prepare scratch space, and make sure there's room for
+        #  everything before starting the slow work
+        #scratch space is removed even if a later step fails
+        self._generator.create_tmp(self._settings)
 
-        #post-process tracks individually       
-        for e in self._entry_list.entries:
-            # e.track_file = self._generator.convert_to_ogg(e, self._settings)
-            e.length = self._generator.get_track_length(e)
-            e.title = self._generator.sanitize(e)
-            self.emit_update_progress()
+        try:
+            self._generator.check_disk_space(self._entry_list, self._settings)
 
-        #generate datapack
-        self._generator.generate_datapack(self._entry_list, self._settings)
-        self.emit_update_progress()
+            #process tracks
+            self._generator.convert_all_to_ogg(self._entry_list, self._settings, self.emit_update_progress)
 
-        #generate resourcepack
-        self._generator.generate_resourcepack(self._entry_list, self._settings)
-        self.emit_update_progress()
+            #process textures
+            self._generator.process_all_textures(self._entry_list, self._settings)
+
+            #post-process tracks individually
+            for e in self._entry_list.entries:
+                # e.track_file = self._generator.convert_to_ogg(e, self._settings)
+                e.length = self._generator.get_track_length(e)
+                e.title = self._generator.sanitize(e)
+                self.emit_update_progress()
+
+            #generate datapack and resourcepack
+            self._generator.generate_packs(self._entry_list, self._settings, self.emit_update_progress)
 
         #finish up and return to generate()
-        self._generator.cleanup_tmp()
+        finally:
+            self._generator.cleanup_tmp()
+
         print("Successfully generated datapack and resourcepack!")
 
 
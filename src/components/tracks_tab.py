@@ -195,6 +195,9 @@ class DiscListEntry(VirtualDiscListEntry):
         self._btnUpArrow = ArrowButton(ButtonType.ARROW_UP, self)
         self._btnDownArrow = ArrowButton(ButtonType.ARROW_DOWN, self)
 
+        #CustomModelData number of this disc, 0 until one is assigned
+        self._customModelData = 0
+
         self._leTitle.setMaxLength(Constants.LINE_EDIT_MAX_CHARS)
         self._leTitle.setSizePolicy(QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.MinimumExpanding, QtWidgets.QSizePolicy.Preferred))
         self._lblIName.setSizePolicy(QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.MinimumExpanding, QtWidgets.QSizePolicy.Preferred))
@@ -300,14 +303,19 @@ class DiscListEntry(VirtualDiscListEntry):
         return DiscListEntryContents(texture_file   = self._btnIcon.getFile(),
                                      track_file     = self._btnTrack.getFile(),
                                      title          = self._leTitle.text(),
-                                     internal_name  = self._lblIName.text())
+                                     internal_name  = self._lblIName.text(),
+                                     custom_model_data = self._customModelData)
 
     def setEntry(self, entry_contents: DiscListEntryContents):
         self._btnIcon.setFile(entry_contents.texture_file)
         self._btnTrack.setFile(entry_contents.track_file)
+        self.setCustomModelData(entry_contents.custom_model_data)
 
         self.setTitle([ entry_contents.track_file ])
 
+    def setCustomModelData(self, custom_model_data: int):
+        self._customModelData = custom_model_data
+
     def setTitle(self, fFileList: List[str]):
         title = QtCore.QFileInfo(fFileList[0]).completeBaseName()
         self._leTitle.setText(title)
@@ -429,6 +437,15 @@ class DiscList(QtWidgets.QWidget):
 
         return entry_list
 
+    #store CustomModelData numbers assigned during generation, so
+    #  they're saved with the rest of the track data
+    def setCustomModelData(self, entry_list: DiscListContents):
+        widgets = [self._childLayout.itemAt(i).widget() for i in range(self._childLayout.count())]
+        widgets = [w for w in widgets if type(w) == DiscListEntry]
+
+        for widget, entry in zip(widgets, entry_list.entries):
+            widget.setCustomModelData(entry.custom_model_data)
+
     def getNumDiscEntries(self) -> int:
         #layout has DiscListEntries + stretch + NewDiscEntry
         return self._childLayout.count()-2
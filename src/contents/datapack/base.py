@@ -6,20 +6,31 @@
 # Virtual class that forms the beginning of a chain of classes that
 #   inherit each other to define the datapack contents
 # virtual -> v2.0 -> v2.1 -> ...
+#
+# options is a tuple of the names of optional datapack designs to use
+#   instead of the defaults. Options are added after the contents of
+#   every datapack version, so they can replace files from any version
 class VirtualDatapackContents():
 
-    def __init__(self):
+    def __init__(self, options: tuple = ()):
+        self._options = options
+
         self.add_contents()
+        self.add_options()
 
     def add_contents(self):
         pass
 
+    def add_options(self):
+        pass
+
     #use list comprehension to collect the contents of all instance attributes in
     #  self.__dict__ (returns a list of all 'self.x' variables from this class instance)
+    #attributes starting with '_' hold settings, not datapack files
     @property
     def contents(self):
         attr_dict = self.__dict__
         return [attr_dict[k] for k in attr_dict \
-                if not k.startswith('__') and not callable(getattr(self, k))]
+                if not k.startswith('_') and not callable(getattr(self, k))]
 
 
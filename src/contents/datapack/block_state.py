@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+#
+#Infinite Music Discs datapack block state polling contents
+#Generation tool, datapack design, and resourcepack design by link2_thepast
+
+
+
+# Optional replacement for checking the jukebox's IsPlaying NBT on
+#   every poll. Reading block NBT makes the server save the whole
+#   jukebox block entity, so instead the has_record block state is
+#   polled, and NBT is only read when a disc goes in or comes out,
+#   or when a custom disc's play time runs out
+# A vanilla disc that finishes playing stays 'playing' until it's
+#   taken out, since only the NBT says when it's done
+
+jukebox_check_playing = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_check_playing.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+execute as @s[tag=!imd_has_record] if block ~ ~ ~ minecraft:jukebox[has_record=true] run function {datapack_name}:jukebox_on_insert
+execute as @s[tag=imd_has_record] if block ~ ~ ~ minecraft:jukebox[has_record=false] run function {datapack_name}:jukebox_on_eject
+execute as @s[tag=imd_is_playing,tag=imd_has_custom_disc,scores={{imd_play_time=..0}}] unless block ~ ~ ~ minecraft:jukebox{{IsPlaying:1b}} run function {datapack_name}:jukebox_on_stop
+"""
+}
+
+jukebox_on_insert = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_on_insert.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+tag @s add imd_has_record
+execute as @s[tag=!imd_is_playing] if block ~ ~ ~ minecraft:jukebox{{IsPlaying:1b}} run function {datapack_name}:jukebox_on_play
+"""
+}
+
+jukebox_on_eject = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_on_eject.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+tag @s remove imd_has_record
+execute as @s[tag=imd_is_playing] run function {datapack_name}:jukebox_on_stop
+"""
+}
+
+
+
+def add_contents(dp):
+    dp.jukebox_check_playing = jukebox_check_playing
+    dp.jukebox_on_insert = jukebox_on_insert
+    dp.jukebox_on_eject = jukebox_on_eject
@@ -5,20 +5,23 @@
 
 from src.contents.datapack.v2p0 import DatapackContents_v2p0
 from src.contents.datapack.v2p1 import DatapackContents_v2p1
+from src.contents.datapack.v2p2 import DatapackContents_v2p2
 
 # Factory to select between different DatapackContents child
 #   classes. Uses pack_format to pick which datapack version to use
 # If versions is sorted in ascending order (v0 -> v1 -> v2 -> etc)
 #   then the factory will pick the latest datapack version compatible
-#   with the given pack_format
+#   with the given pack_format. Versions with an opt_in option are
+#   only picked if that option is given
 versions = [
     DatapackContents_v2p0,
-    DatapackContents_v2p1
+    DatapackContents_v2p1,
+    DatapackContents_v2p2
 ]
 
-def get(pack_format: int):
+def get(pack_format: int, options: tuple = ()):
     for v in versions:
-        if v.min_pack_format <= pack_format:
+        if v.min_pack_format <= pack_format and (v.opt_in is None or v.opt_in in options):
             sel_version = v
 
-    return sel_version()
+    return sel_version(options)
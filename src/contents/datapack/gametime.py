@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#
+#Infinite Music Discs datapack game time timers contents
+#Generation tool, datapack design, and resourcepack design by link2_thepast
+
+
+
+# Optional replacement for counting play timers down every tick.
+#   pre_play stores the game time each timer runs out at in
+#   imd_play_time and imd_stop_11_time, and timers are compared
+#   against the current game time in #imd_now imd_play_time
+# Datapacks with function macros schedule a one-shot check for when
+#   the timers run out, so playing jukeboxes cost nothing per tick.
+#   In case a scheduled check is lost (/schedule clear, or the world
+#   closing in between), playing jukeboxes are also checked once
+#   a second. Older datapacks read the game time once per tick and
+#   compare each playing jukebox against it
+
+gametime_tick = {
+    'path': ['data', '{datapack_name}', 'functions', 'gametime_tick.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+execute store result score #imd_now imd_play_time run time query gametime
+"""
+}
+
+pre_play = {
+    'path': ['data', '{datapack_name}', 'functions', 'pre_play.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+execute store result score @s imd_disc_id run data get block ~ ~ ~ RecordItem.tag.CustomModelData
+function {datapack_name}:play_duration
+execute store result score #imd_now imd_play_time run time query gametime
+scoreboard players operation @s imd_play_time += #imd_now imd_play_time
+scoreboard players operation @s imd_stop_11_time = #imd_now imd_play_time
+scoreboard players add @s imd_stop_11_time 3
+function {datapack_name}:watchdog_reset_tickcount
+execute as @a[distance=..64] run function {datapack_name}:register_jukebox_listener
+"""
+}
+
+jukebox_tick_timers = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_tick_timers.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+execute if score @s imd_play_time <= #imd_now imd_play_time run data merge block ~ ~ ~ {{RecordStartTick:-999999L}}
+execute as @s[tag=!imd_stopped_11] if score @s imd_stop_11_time <= #imd_now imd_play_time run function {datapack_name}:stop_11
+"""
+}
+
+#same as src.contents.datapack.block_state, except the play time
+#  has run out once the end time has passed
+jukebox_check_playing_block_state = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_check_playing.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+execute as @s[tag=!imd_has_record] if block ~ ~ ~ minecraft:jukebox[has_record=true] run function {datapack_name}:jukebox_on_insert
+execute as @s[tag=imd_has_record] if block ~ ~ ~ minecraft:jukebox[has_record=false] run function {datapack_name}:jukebox_on_eject
+execute as @s[tag=imd_is_playing,tag=imd_has_custom_disc] if score @s imd_play_time <= #imd_now imd_play_time unless block ~ ~ ~ minecraft:jukebox{{IsPlaying:1b}} run function {datapack_name}:jukebox_on_stop
+"""
+}
+
+# scheduled timers, for datapacks with function macros
+#play_duration has just loaded the disc into lookup.disc
+#schedule can't run a function on the current tick, so the delay
+#  is at least 1 tick, even for discs with no length
+pre_play_scheduled = {
+    'path': ['data', '{datapack_name}', 'functions', 'pre_play.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+execute store result score @s imd_disc_id run data get block ~ ~ ~ RecordItem.tag.CustomModelData
+function {datapack_name}:play_duration
+scoreboard players operation #imd_delay imd_play_time = @s imd_play_time
+execute if score #imd_delay imd_play_time matches ..0 run scoreboard players set #imd_delay imd_play_time 1
+execute store result storage {datapack_name}:global lookup.disc.delay int 1.0 run scoreboard players get #imd_delay imd_play_time
+function {datapack_name}:schedule_timers with storage {datapack_name}:global lookup.disc
+execute store result score #imd_now imd_play_time run time query gametime
+scoreboard players operation @s imd_play_time += #imd_now imd_play_time
+scoreboard players operation @s imd_stop_11_time = #imd_now imd_play_time
+scoreboard players add @s imd_stop_11_time 3
+function {datapack_name}:watchdog_reset_tickcount
+execute as @a[distance=..64] run function {datapack_name}:register_jukebox_listener
+"""
+}
+
+#'append' keeps the checks of other playing jukeboxes scheduled
+schedule_timers = {
+    'path': ['data', '{datapack_name}', 'functions', 'schedule_timers.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+$schedule function {datapack_name}:jukebox_timers_due $(delay)t append
+schedule function {datapack_name}:jukebox_timers_due 3t append
+"""
+}
+
+jukebox_timers_due = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_timers_due.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+execute store result score #imd_now imd_play_time run time query gametime
+execute as @e[type=marker,tag=imd_jukebox_marker,tag=imd_is_playing,tag=imd_has_custom_disc] at @s run function {datapack_name}:jukebox_tick_timers
+"""
+}
+
+setup_load_gametime = {
+    'path': ['data', '{datapack_name}', 'functions', 'setup_load_gametime.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+schedule function {datapack_name}:jukebox_timers_fallback 1s replace
+"""
+}
+
+jukebox_timers_fallback = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_timers_fallback.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+schedule function {datapack_name}:jukebox_timers_fallback 1s replace
+function {datapack_name}:jukebox_timers_due
+"""
+}
+
+jukebox_marker_tick = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_marker_tick.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+execute unless block ~ ~ ~ minecraft:jukebox run function {datapack_name}:destroy_jukebox_marker
+execute if block ~ ~ ~ minecraft:jukebox run function {datapack_name}:jukebox_check_playing
+"""
+}
+
+
+
+def add_contents(dp):
+    dp.jukebox_tick_timers = jukebox_tick_timers
+
+    if 'block_state_polling' in dp._options:
+        dp.jukebox_check_playing = jukebox_check_playing_block_state
+
+    if dp.supports_macros:
+        dp.add_load_function('{datapack_name}:setup_load_gametime')
+
+        dp.pre_play = pre_play_scheduled
+        dp.schedule_timers = schedule_timers
+        dp.jukebox_timers_due = jukebox_timers_due
+        dp.setup_load_gametime = setup_load_gametime
+        dp.jukebox_timers_fallback = jukebox_timers_fallback
+        dp.jukebox_marker_tick = jukebox_marker_tick
+    else:
+        dp.add_tick_function('{datapack_name}:gametime_tick')
+        dp.gametime_tick = gametime_tick
+        dp.pre_play = pre_play
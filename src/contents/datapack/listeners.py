@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+#
+#Infinite Music Discs datapack scoreboard listener tracking contents
+#Generation tool, datapack design, and resourcepack design by link2_thepast
+
+
+
+# Optional replacement for storing each jukebox's listeners in lists in
+#   the marker's NBT. Every jukebox marker gets an imd_jukebox_id, and
+#   every player who hears a jukebox gets its id as their imd_listen_id.
+#   Stopping a jukebox tags its listeners with one pass over the players,
+#   then stops the sound for all of them with one stopsound
+# A player only remembers the last jukebox they heard. If a player
+#   hears two custom discs at once, stopping the first jukebox won't
+#   stop its sound for them
+
+setup_load_listeners = {
+    'path': ['data', '{datapack_name}', 'functions', 'setup_load_listeners.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+scoreboard objectives add imd_jukebox_id dummy
+scoreboard objectives add imd_listen_id dummy
+"""
+}
+
+assign_jukebox_id = {
+    'path': ['data', '{datapack_name}', 'functions', 'assign_jukebox_id.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+execute store result score @s imd_jukebox_id run scoreboard players add #imd_id_global imd_jukebox_id 1
+"""
+}
+
+jukebox_on_play = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_on_play.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+tag @s add imd_is_playing
+execute if data block ~ ~ ~ RecordItem.tag.CustomModelData run tag @s add imd_has_custom_disc
+execute as @s[tag=imd_has_custom_disc] unless score @s imd_jukebox_id matches 1.. run function {datapack_name}:assign_jukebox_id
+execute as @s[tag=imd_has_custom_disc] run function {datapack_name}:pre_play
+"""
+}
+
+register_jukebox_listener = {
+    'path': ['data', '{datapack_name}', 'functions', 'register_jukebox_listener.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+scoreboard players operation @s imd_listen_id = @e[type=marker,tag=imd_jukebox_marker,distance=..0.1,limit=1] imd_jukebox_id
+function {datapack_name}:play
+"""
+}
+
+#run as the jukebox marker
+tag_listeners = {
+    'path': ['data', '{datapack_name}', 'functions', 'tag_listeners.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+scoreboard players operation #imd_stop imd_jukebox_id = @s imd_jukebox_id
+execute as @a if score @s imd_listen_id = #imd_stop imd_jukebox_id run tag @s add imd_listener
+"""
+}
+
+stop_11 = {
+    'path': ['data', '{datapack_name}', 'functions', 'stop_11.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+function {datapack_name}:tag_listeners
+stopsound @a[tag=imd_listener] record minecraft:music_disc.11
+tag @a remove imd_listener
+tag @s add imd_stopped_11
+"""
+}
+
+disc_stop = {
+    'path': ['data', '{datapack_name}', 'functions', '{entry.internal_name}', 'stop.mcfunction'],
+    'repeat': 'copy',
+    'contents': \
+"""
+function {datapack_name}:tag_listeners
+stopsound @a[tag=imd_listener] record minecraft:music_disc.{entry.internal_name}
+scoreboard players reset @a[tag=imd_listener] imd_listen_id
+tag @a remove imd_listener
+"""
+}
+
+#for datapacks with function macros, see src.contents.datapack.v2p2
+disc_stop_macro = {
+    'path': ['data', '{datapack_name}', 'functions', 'disc_stop.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+function {datapack_name}:tag_listeners
+$stopsound @a[tag=imd_listener] record minecraft:music_disc.$(name)
+scoreboard players reset @a[tag=imd_listener] imd_listen_id
+tag @a remove imd_listener
+"""
+}
+
+
+
+def add_contents(dp):
+    dp.add_load_function('{datapack_name}:setup_load_listeners')
+
+    dp.setup_load_listeners = setup_load_listeners
+    dp.assign_jukebox_id = assign_jukebox_id
+    dp.jukebox_on_play = jukebox_on_play
+    dp.register_jukebox_listener = register_jukebox_listener
+    dp.tag_listeners = tag_listeners
+    dp.stop_11 = stop_11
+
+    if dp.supports_macros:
+        dp.disc_stop = disc_stop_macro
+    else:
+        dp.disc_stop = disc_stop
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#
+#Infinite Music Discs datapack tiered polling contents
+#Generation tool, datapack design, and resourcepack design by link2_thepast
+
+
+
+# Optional replacement for polling every jukebox marker every tick.
+#   Markers are polled in three tiers, and each tier selects only its
+#   own markers by tag, so idle markers aren't touched every tick:
+#   - playing markers every tick, from the tick function
+#   - markers that played recently, or that a player just put a disc
+#     into, every {poll_recent_interval} ticks for {poll_recent_ticks} ticks.
+#     These are tagged imd_poll_recent
+#   - every other marker every {poll_interval} ticks. Each marker gets
+#     one of 5 bucket tags (imd_poll_b0 to imd_poll_b4) when it's
+#     registered, and one bucket is polled every {poll_step} ticks, so
+#     only a fifth of the idle markers are polled at once
+# The recent and idle tiers are 'schedule' loops. Tick functions run
+#   before scheduled functions in a tick, so the playing tier tags the
+#   markers it polled with imd_polled, and the scheduled tiers skip them.
+#   A marker that stops playing is not polled again that tick, and one
+#   that starts playing in a scheduled tier waits for the next tick
+
+setup_load_polling = {
+    'path': ['data', '{datapack_name}', 'functions', 'setup_load_polling.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+scoreboard objectives add imd_poll_timer dummy
+execute as @e[type=marker,tag=imd_jukebox_marker,tag=!imd_poll_b0,tag=!imd_poll_b1,tag=!imd_poll_b2,tag=!imd_poll_b3,tag=!imd_poll_b4] run function {datapack_name}:jukebox_assign_bucket
+schedule function {datapack_name}:jukebox_poll_recent {poll_recent_interval}t replace
+schedule function {datapack_name}:jukebox_poll_idle {poll_step}t replace
+"""
+}
+
+#markers are spread over the buckets in turn
+register_jukebox_marker = {
+    'path': ['data', '{datapack_name}', 'functions', 'register_jukebox_marker.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+summon marker ~ ~ ~ {{Tags:["imd_jukebox_marker","imd_poll_new"]}}
+execute as @e[type=marker,tag=imd_poll_new] run function {datapack_name}:jukebox_assign_bucket
+"""
+}
+
+jukebox_assign_bucket = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_assign_bucket.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+tag @s remove imd_poll_new
+scoreboard players add #imd_poll_next imd_poll_timer 1
+execute if score #imd_poll_next imd_poll_timer matches 5.. run scoreboard players set #imd_poll_next imd_poll_timer 0
+execute if score #imd_poll_next imd_poll_timer matches 0 run tag @s add imd_poll_b0
+execute if score #imd_poll_next imd_poll_timer matches 1 run tag @s add imd_poll_b1
+execute if score #imd_poll_next imd_poll_timer matches 2 run tag @s add imd_poll_b2
+execute if score #imd_poll_next imd_poll_timer matches 3 run tag @s add imd_poll_b3
+execute if score #imd_poll_next imd_poll_timer matches 4 run tag @s add imd_poll_b4
+"""
+}
+
+jukebox_event_tick = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_event_tick.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+tag @e[type=marker,tag=imd_polled] remove imd_polled
+execute as @e[type=marker,tag=imd_jukebox_marker,tag=imd_is_playing] at @s run function {datapack_name}:jukebox_poll_playing
+"""
+}
+
+jukebox_poll_playing = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_poll_playing.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+tag @s add imd_polled
+function {datapack_name}:jukebox_marker_tick
+execute if entity @s[tag=!imd_is_playing] run function {datapack_name}:jukebox_poll_wake
+"""
+}
+
+#move a marker into the recent tier
+jukebox_poll_wake = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_poll_wake.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+tag @s add imd_poll_recent
+scoreboard players set @s imd_poll_timer {poll_recent_ticks}
+"""
+}
+
+jukebox_poll_recent = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_poll_recent.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+schedule function {datapack_name}:jukebox_poll_recent {poll_recent_interval}t replace
+execute as @e[type=marker,tag=imd_jukebox_marker,tag=imd_poll_recent,tag=!imd_is_playing,tag=!imd_polled] at @s run function {datapack_name}:jukebox_marker_recent
+"""
+}
+
+jukebox_marker_recent = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_marker_recent.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+scoreboard players remove @s imd_poll_timer {poll_recent_interval}
+function {datapack_name}:jukebox_marker_tick
+tag @s[scores={{imd_poll_timer=..0}}] remove imd_poll_recent
+"""
+}
+
+jukebox_poll_idle = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_poll_idle.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+schedule function {datapack_name}:jukebox_poll_idle {poll_step}t replace
+scoreboard players add #imd_poll_step imd_poll_timer 1
+execute if score #imd_poll_step imd_poll_timer matches 5.. run scoreboard players set #imd_poll_step imd_poll_timer 0
+execute if score #imd_poll_step imd_poll_timer matches 0 as @e[type=marker,tag=imd_poll_b0,tag=!imd_is_playing,tag=!imd_poll_recent,tag=!imd_polled] at @s run function {datapack_name}:jukebox_marker_tick
+execute if score #imd_poll_step imd_poll_timer matches 1 as @e[type=marker,tag=imd_poll_b1,tag=!imd_is_playing,tag=!imd_poll_recent,tag=!imd_polled] at @s run function {datapack_name}:jukebox_marker_tick
+execute if score #imd_poll_step imd_poll_timer matches 2 as @e[type=marker,tag=imd_poll_b2,tag=!imd_is_playing,tag=!imd_poll_recent,tag=!imd_polled] at @s run function {datapack_name}:jukebox_marker_tick
+execute if score #imd_poll_step imd_poll_timer matches 3 as @e[type=marker,tag=imd_poll_b3,tag=!imd_is_playing,tag=!imd_poll_recent,tag=!imd_polled] at @s run function {datapack_name}:jukebox_marker_tick
+execute if score #imd_poll_step imd_poll_timer matches 4 as @e[type=marker,tag=imd_poll_b4,tag=!imd_is_playing,tag=!imd_poll_recent,tag=!imd_polled] at @s run function {datapack_name}:jukebox_marker_tick
+"""
+}
+
+#wake up the jukebox a player just put a disc into
+on_placed_disc = {
+    'path': ['data', '{datapack_name}', 'functions', 'on_placed_disc.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+advancement revoke @s only {datapack_name}:placed_disc
+execute as @s run function {datapack_name}:raycast_start
+execute as @e[type=marker,tag=imd_jukebox_marker,distance=..8] run function {datapack_name}:jukebox_poll_wake
+"""
+}
+
+
+
+def add_contents(dp):
+    dp.add_load_function('{datapack_name}:setup_load_polling')
+
+    dp.setup_load_polling = setup_load_polling
+    dp.register_jukebox_marker = register_jukebox_marker
+    dp.jukebox_assign_bucket = jukebox_assign_bucket
+    dp.jukebox_event_tick = jukebox_event_tick
+    dp.jukebox_poll_playing = jukebox_poll_playing
+    dp.jukebox_poll_wake = jukebox_poll_wake
+    dp.jukebox_poll_recent = jukebox_poll_recent
+    dp.jukebox_marker_recent = jukebox_marker_recent
+    dp.jukebox_poll_idle = jukebox_poll_idle
+    dp.on_placed_disc = on_placed_disc
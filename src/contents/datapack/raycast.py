@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+#Infinite Music Discs datapack coarse-to-fine raycast contents
+#Generation tool, datapack design, and resourcepack design by link2_thepast
+
+
+
+# Optional replacement for the raycast that finds the jukebox a player
+#   used. The default raycast takes 1000 steps of 0.005 blocks. This one
+#   takes 0.25 block steps, and whenever a step lands in a block that
+#   isn't air, it goes back over the last step 0.025 blocks at a time
+#   to look for a jukebox the coarse step could have skipped past
+# Following the ray block by block (DDA) would need division and
+#   position math that commands can't do cheaply, so the fine pass
+#   stands in for finding the exact block the ray entered
+
+setup_load_raycast = {
+    'path': ['data', '{datapack_name}', 'functions', 'setup_load_raycast.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+scoreboard objectives add imd_rc_fine dummy
+"""
+}
+
+raycast_hit = {
+    'path': ['data', '{datapack_name}', 'functions', 'raycast_hit.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+scoreboard players set @s imd_rc_steps 1
+scoreboard players set @s imd_rc_fine 0
+execute align xyz positioned ~0.5 ~0.5 ~0.5 unless entity @e[type=marker,tag=imd_jukebox_marker,distance=..0.1,limit=1] run function {datapack_name}:register_jukebox_marker
+"""
+}
+
+raycast_refine = {
+    'path': ['data', '{datapack_name}', 'functions', 'raycast_refine.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+execute if block ~ ~ ~ minecraft:jukebox run function {datapack_name}:raycast_hit
+scoreboard players remove @s imd_rc_fine 1
+execute if score @s imd_rc_fine matches 1.. positioned ^ ^ ^0.025 run function {datapack_name}:raycast_refine
+"""
+}
+
+#reaches 5 blocks, like the default raycast
+raycast_start = {
+    'path': ['data', '{datapack_name}', 'functions', 'raycast_start.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+scoreboard players set @s imd_rc_steps 21
+execute at @s anchored eyes positioned ^ ^ ^ run function {datapack_name}:raycast_step
+"""
+}
+
+raycast_step = {
+    'path': ['data', '{datapack_name}', 'functions', 'raycast_step.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+execute unless block ~ ~ ~ minecraft:air run scoreboard players set @s imd_rc_fine 11
+execute if score @s imd_rc_fine matches 1.. positioned ^ ^ ^-0.25 run function {datapack_name}:raycast_refine
+scoreboard players remove @s imd_rc_steps 1
+execute if score @s imd_rc_steps matches 1.. positioned ^ ^ ^0.25 run function {datapack_name}:raycast_step
+"""
+}
+
+
+
+def add_contents(dp):
+    dp.add_load_function('{datapack_name}:setup_load_raycast')
+
+    dp.setup_load_raycast = setup_load_raycast
+    dp.raycast_hit = raycast_hit
+    dp.raycast_refine = raycast_refine
+    dp.raycast_start = raycast_start
+    dp.raycast_step = raycast_step
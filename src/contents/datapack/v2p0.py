@@ -3,6 +3,14 @@
 #Infinite Music Discs datapack v2.0 contents
 #Generation tool, datapack design, and resourcepack design by link2_thepast
 
+import copy
+
+import src.contents.datapack.polling as polling
+import src.contents.datapack.block_state as block_state
+import src.contents.datapack.gametime as gametime
+import src.contents.datapack.raycast as raycast
+import src.contents.datapack.listeners as listeners
+
 from src.contents.datapack.base import VirtualDatapackContents
 
 
@@ -21,8 +29,6 @@ pack_mcmeta = {
 }
 
 # creeper loot table
-creeper_music_entries = []
-
 creeper_music_entry_base = {
     'type': 'minecraft:tag',
     'weight': 1,
@@ -66,7 +72,7 @@ creeper_json = {
     'type':'minecraft:entity',
     'pools':[
         {'rolls':1, 'entries':creeper_normal_entries},
-        {'rolls':1, 'entries':creeper_music_entries, 'conditions':[{
+        {'rolls':1, 'entries':[], 'conditions':[{
             'condition':'minecraft:entity_properties',
             'predicate':{'type':'#minecraft:skeletons'},
             'entity':'killer'
@@ -75,6 +81,30 @@ creeper_json = {
 }
 }
 
+# creeper loot table buckets
+#with many discs, the music disc entries are split into buckets, each
+#  stored in its own loot table. creeper.json picks a bucket weighted
+#  by its number of discs, then the bucket picks one of its discs, so
+#  every disc keeps the same chance to drop
+creeper_bucket_entry = {
+    'type': 'minecraft:loot_table',
+    'weight': 1,
+    'name': '{datapack_name}:creeper_discs/{bucket}'
+}
+
+creeper_bucket_json = {
+    'path': ['data', '{datapack_name}', 'loot_tables', 'creeper_discs'],
+    'repeat': 'single',
+    'format_contents': False,
+    'contents': \
+{
+    'type':'minecraft:entity',
+    'pools':[
+        {'rolls':1, 'entries':[]}
+    ]
+}
+}
+
 # advancements
 placed_disc = {
     'path': ['data', '{datapack_name}', 'advancements', 'placed_disc.json'],
@@ -212,9 +242,20 @@ jukebox_event_tick = {
     'repeat': 'single',
     'contents': \
 """
-execute as @e[type=marker,tag=imd_jukebox_marker] at @s unless block ~ ~ ~ minecraft:jukebox run function {datapack_name}:destroy_jukebox_marker
-execute as @e[type=marker,tag=imd_jukebox_marker] at @s if block ~ ~ ~ minecraft:jukebox run function {datapack_name}:jukebox_check_playing
-execute as @e[type=marker,tag=imd_jukebox_marker,tag=imd_is_playing,tag=imd_has_custom_disc] at @s run function {datapack_name}:jukebox_tick_timers
+execute as @e[type=marker,tag=imd_jukebox_marker] at @s run function {datapack_name}:jukebox_marker_tick
+"""
+}
+
+#all per-tick work for one jukebox marker, so the markers
+#  only have to be searched for once per tick
+jukebox_marker_tick = {
+    'path': ['data', '{datapack_name}', 'functions', 'jukebox_marker_tick.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+execute unless block ~ ~ ~ minecraft:jukebox run function {datapack_name}:destroy_jukebox_marker
+execute if block ~ ~ ~ minecraft:jukebox run function {datapack_name}:jukebox_check_playing
+execute if entity @s[tag=imd_is_playing,tag=imd_has_custom_disc] run function {datapack_name}:jukebox_tick_timers
 """
 }
 
@@ -276,6 +317,10 @@ execute as @s run function {datapack_name}:raycast_start
 play = {
     'path': ['data', '{datapack_name}', 'functions', 'play.mcfunction'],
     'repeat': 'copy_within', #single, copy_within, copy
+    'dispatch': {
+        #score compared against each disc's custom_model_data
+        'score': '@e[type=marker,tag=imd_jukebox_marker,distance=..0.1,limit=1] imd_disc_id'
+    },
     'contents': \
 """
 execute if score @e[type=marker,tag=imd_jukebox_marker,distance=..0.1,limit=1] imd_disc_id matches {entry.custom_model_data} run function {datapack_name}:{entry.internal_name}/play
@@ -285,6 +330,9 @@ execute if score @e[type=marker,tag=imd_jukebox_marker,distance=..0.1,limit=1] i
 play_duration = {
     'path': ['data', '{datapack_name}', 'functions', 'play_duration.mcfunction'],
     'repeat': 'copy_within',
+    'dispatch': {
+        'score': '@s imd_disc_id'
+    },
     'contents': \
 """
 execute if score @s imd_disc_id matches {entry.custom_model_data} run function {datapack_name}:{entry.internal_name}/play_duration
@@ -380,6 +428,12 @@ execute as @a[tag=!imd_has_id] run function {datapack_name}:register_player
 set_disc_track = {
     'path': ['data', '{datapack_name}', 'functions', 'set_disc_track.mcfunction'],
     'repeat': 'copy_within',
+    'dispatch': {
+        #the held disc is matched by NBT, so copy its
+        #  custom_model_data into a score before searching
+        'setup': 'execute store result score @s imd_disc_id run data get entity @s SelectedItem.tag.CustomModelData',
+        'score': '@s imd_disc_id'
+    },
     'contents': \
 """
 execute as @s[nbt={{SelectedItem:{{id:"minecraft:music_disc_11", tag:{{CustomModelData:{entry.custom_model_data}}}}}}}] run item replace entity @s weapon.mainhand with minecraft:music_disc_11{{CustomModelData:{entry.custom_model_data}, HideFlags:32, display:{{Lore:["\\"\\\\u00a77{entry.title}\\""]}}}}
@@ -407,6 +461,9 @@ tellraw @a [{{"text":"Type ", "color":"gold"}}, {{"text":"/function {datapack_na
 stop = {
     'path': ['data', '{datapack_name}', 'functions', 'stop.mcfunction'],
     'repeat': 'copy_within',
+    'dispatch': {
+        'score': '@s imd_disc_id'
+    },
     'contents': \
 """
 execute if score @s imd_disc_id matches {entry.custom_model_data} run function {datapack_name}:{entry.internal_name}/stop
@@ -486,11 +543,17 @@ execute if data entity @s data.Listeners[0] run function {datapack_name}:{entry.
 #   versions. Future datapack versions may override this one if their
 #   min_pack_format requirement is met, and so on until the latest supported
 #   datapack version is found and used.
+# If opt_in is set, this datapack version is also skipped unless that
+#   option was passed in, so it has to be turned on in the settings.
 class DatapackContents_v2p0(VirtualDatapackContents):
 
     min_pack_format = 12
     version_major = 2
     version_minor = 0
+    opt_in = None
+
+    #function macros were added in 1.20.2
+    supports_macros = False
 
     #all datapack files except pack.mcmeta and creeper.json
     #those files are more complicated and require extra effort
@@ -505,6 +568,7 @@ class DatapackContents_v2p0(VirtualDatapackContents):
         self.help = help
         self.jukebox_check_playing = jukebox_check_playing
         self.jukebox_event_tick = jukebox_event_tick
+        self.jukebox_marker_tick = jukebox_marker_tick
         self.jukebox_on_play = jukebox_on_play
         self.jukebox_on_stop = jukebox_on_stop
         self.jukebox_tick_timers = jukebox_tick_timers
@@ -529,28 +593,72 @@ class DatapackContents_v2p0(VirtualDatapackContents):
         self.disc_play_duration = disc_play_duration
         self.disc_stop = disc_stop
 
+    #optional datapack designs, picked with generator settings
+    def add_options(self):
+        if 'poll_interval' in self._options:
+            polling.add_contents(self)
+
+        if 'block_state_polling' in self._options:
+            block_state.add_contents(self)
+
+        if 'gametime_timers' in self._options:
+            gametime.add_contents(self)
+
+        if 'fast_raycast' in self._options:
+            raycast.add_contents(self)
+
+        if 'score_listeners' in self._options:
+            listeners.add_contents(self)
+
+    #run another function when the datapack loads, after setup_load
+    #the load tag is shared like every other template, so it's copied
+    #  before being modified
+    def add_load_function(self, function: str):
+        self.load = copy.deepcopy(self.load)
+        self.load['contents']['values'].append(function)
+
+    #run another function every tick, before the other tick functions
+    def add_tick_function(self, function: str):
+        self.tick = copy.deepcopy(self.tick)
+        self.tick['contents']['values'].insert(0, function)
+
     @property
     def version_str(self):
         return f"v{self.version_major}.{self.version_minor}"
 
     #pack.mcmeta
+    #the module-level templates are shared by every generation running
+    #  in this process, so they're never modified. Each call gets its
+    #  own copy instead
     def get_pack_mcmeta(self, pack_format: int):
         #reach inside and set pack_format manually since there's no
         #  string formatting equivalent for integers
-        pack_mcmeta['contents']['pack']['pack_format'] = pack_format
-        return pack_mcmeta
+        mcmeta = copy.deepcopy(pack_mcmeta)
+        mcmeta['contents']['pack']['pack_format'] = pack_format
+        return mcmeta
 
     #creeper.json
     def get_creeper_music_entry_base(self):
-        return creeper_music_entry_base
+        return copy.deepcopy(creeper_music_entry_base)
 
     def get_creeper_music_entry_custom(self):
-        return creeper_music_entry_custom
+        return copy.deepcopy(creeper_music_entry_custom)
 
     def get_creeper_json(self, creeper_music_entries: list):
         #reach inside and set the music disc entries manually since it's
         #  hard to elegantly generate this file
-        creeper_json['contents']['pools'][1]['entries'] = creeper_music_entries
-        return creeper_json
-
-
+        creeper = copy.deepcopy(creeper_json)
+        creeper['contents']['pools'][1]['entries'] = list(creeper_music_entries)
+        return creeper
+
+    def get_creeper_bucket_entry(self, datapack_name: str, bucket: int, weight: int):
+        entry = copy.deepcopy(creeper_bucket_entry)
+        entry['name'] = entry['name'].format(datapack_name=datapack_name, bucket=bucket)
+        entry['weight'] = weight
+        return entry
+
+    def get_creeper_bucket_json(self, bucket: int, creeper_music_entries: list):
+        bucket_json = copy.deepcopy(creeper_bucket_json)
+        bucket_json['path'].append(f'{bucket}.json')
+        bucket_json['contents']['pools'][0]['entries'] = list(creeper_music_entries)
+        return bucket_json
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+#
+#Infinite Music Discs datapack v2.2 contents
+#Generation tool, datapack design, and resourcepack design by link2_thepast
+
+import src.contents.datapack.v2p0 as v2p0
+
+from src.contents.datapack.v2p1 import DatapackContents_v2p1
+
+
+
+# Datapack v2.2 uses function macros (added in 1.20.2) so per-disc data
+#   lives in one storage table instead of in per-disc functions:
+#   storage {datapack_name}:discs table.cmd<CustomModelData> = {cmd, length, title, name}
+#   storage {datapack_name}:discs names.<internal name> = <CustomModelData>
+# Functions that need a disc copy its custom_model_data into
+#   storage {datapack_name}:global lookup.cmd, call load_disc to copy its
+#   table entry into lookup.disc, then call a macro function with it.
+#   Discs missing from the table leave lookup.disc empty, and the macro
+#   call fails without doing anything
+
+# top-level functions
+give_all_discs = {
+    'path': ['data', '{datapack_name}', 'functions', 'give_all_discs.mcfunction'],
+    'repeat': 'copy_within',
+    'contents': \
+"""
+execute at @s run function {datapack_name}:give_disc {{name:"{entry.internal_name}"}}
+"""
+}
+
+give_disc = {
+    'path': ['data', '{datapack_name}', 'functions', 'give_disc.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+data remove storage {datapack_name}:global lookup
+$data modify storage {datapack_name}:global lookup.cmd set from storage {datapack_name}:discs names.$(name)
+function {datapack_name}:load_disc with storage {datapack_name}:global lookup
+function {datapack_name}:disc_give with storage {datapack_name}:global lookup.disc
+"""
+}
+
+#help text is the same as v2.0, except for the give command
+help = dict(v2p0.help)
+help['contents'] = v2p0.help['contents'].replace(
+    '{{"text":"/function {datapack_name}:give_<disc name>", "color":"yellow"}}',
+    '{{"text":"/function {datapack_name}:give_disc {{name:\\"<disc name>\\"}}", "color":"yellow"}}'
+)
+
+load_disc = {
+    'path': ['data', '{datapack_name}', 'functions', 'load_disc.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+$data modify storage {datapack_name}:global lookup.disc set from storage {datapack_name}:discs table.cmd$(cmd)
+"""
+}
+
+play = {
+    'path': ['data', '{datapack_name}', 'functions', 'play.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+data remove storage {datapack_name}:global lookup
+execute store result storage {datapack_name}:global lookup.cmd int 1.0 run scoreboard players get @e[type=marker,tag=imd_jukebox_marker,distance=..0.1,limit=1] imd_disc_id
+function {datapack_name}:load_disc with storage {datapack_name}:global lookup
+function {datapack_name}:disc_play with storage {datapack_name}:global lookup.disc
+"""
+}
+
+play_duration = {
+    'path': ['data', '{datapack_name}', 'functions', 'play_duration.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+data remove storage {datapack_name}:global lookup
+execute store result storage {datapack_name}:global lookup.cmd int 1.0 run scoreboard players get @s imd_disc_id
+function {datapack_name}:load_disc with storage {datapack_name}:global lookup
+function {datapack_name}:disc_play_duration with storage {datapack_name}:global lookup.disc
+"""
+}
+
+#one line per disc, but only run once when the datapack loads
+register_discs = {
+    'path': ['data', '{datapack_name}', 'functions', 'register_discs.mcfunction'],
+    'repeat': 'copy_within',
+    'contents': \
+"""
+data modify storage {datapack_name}:discs table.cmd{entry.custom_model_data} set value {{cmd:{entry.custom_model_data}, length:{entry.length}, title:"{entry.title}", name:"{entry.internal_name}"}}
+data modify storage {datapack_name}:discs names.{entry.internal_name} set value {entry.custom_model_data}
+"""
+}
+
+set_disc_track = {
+    'path': ['data', '{datapack_name}', 'functions', 'set_disc_track.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+data remove storage {datapack_name}:global lookup
+execute if entity @s[nbt={{SelectedItem:{{id:"minecraft:music_disc_11"}}}}] run data modify storage {datapack_name}:global lookup.cmd set from entity @s SelectedItem.tag.CustomModelData
+function {datapack_name}:load_disc with storage {datapack_name}:global lookup
+function {datapack_name}:disc_set_track with storage {datapack_name}:global lookup.disc
+"""
+}
+
+setup_load = {
+    'path': ['data', '{datapack_name}', 'functions', 'setup_load.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+scoreboard objectives add imd_player_id dummy
+scoreboard objectives add imd_disc_id dummy
+scoreboard objectives add imd_rc_steps dummy
+scoreboard objectives add imd_play_time dummy
+scoreboard objectives add imd_stop_11_time dummy
+
+data remove storage {datapack_name}:discs table
+data remove storage {datapack_name}:discs names
+function {datapack_name}:register_discs
+
+advancement revoke @a only {datapack_name}:placed_disc
+advancement revoke @a only {datapack_name}:placed_jukebox
+tellraw @a [{{"text":"Infinite Music Discs {dp_version_str} by link2_thepast", "color":"gold"}}]
+tellraw @a [{{"text":"Type ", "color":"gold"}}, {{"text":"/function {datapack_name}:help", "color":"yellow"}}, {{"text":" for help", "color":"gold"}}]
+"""
+}
+
+stop = {
+    'path': ['data', '{datapack_name}', 'functions', 'stop.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+data remove storage {datapack_name}:global lookup
+execute store result storage {datapack_name}:global lookup.cmd int 1.0 run scoreboard players get @s imd_disc_id
+function {datapack_name}:load_disc with storage {datapack_name}:global lookup
+function {datapack_name}:disc_stop with storage {datapack_name}:global lookup.disc
+"""
+}
+
+# per-disc functions
+# these are macro functions called with a disc's table entry
+disc_give = {
+    'path': ['data', '{datapack_name}', 'functions', 'disc_give.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+$execute at @s run summon item ~ ~ ~ {{Item:{{id:"minecraft:music_disc_11", Count:1b, tag:{{CustomModelData:$(cmd), HideFlags:32, display:{{Lore:["\\"\\\\u00a77$(title)\\""]}}}}}}}}
+"""
+}
+
+disc_play = {
+    'path': ['data', '{datapack_name}', 'functions', 'disc_play.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+$title @s actionbar {{"text":"Now Playing: $(title)", "color":"green"}}
+$playsound minecraft:music_disc.$(name) record @s ~ ~ ~ 4 1
+"""
+}
+
+disc_play_duration = {
+    'path': ['data', '{datapack_name}', 'functions', 'disc_play_duration.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+$scoreboard players set @s imd_play_time $(length)
+"""
+}
+
+disc_set_track = {
+    'path': ['data', '{datapack_name}', 'functions', 'disc_set_track.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+$item replace entity @s weapon.mainhand with minecraft:music_disc_11{{CustomModelData:$(cmd), HideFlags:32, display:{{Lore:["\\"\\\\u00a77$(title)\\""]}}}}
+"""
+}
+
+#lookup.disc is left alone while listeners are stopped, so
+#  the recursive call can pass it on again
+disc_stop = {
+    'path': ['data', '{datapack_name}', 'functions', 'disc_stop.mcfunction'],
+    'repeat': 'single',
+    'contents': \
+"""
+execute store result score @s imd_player_id run data get entity @s data.Listeners[0]
+data remove entity @s data.Listeners[0]
+$execute as @a if score @s imd_player_id = @e[type=marker,tag=imd_jukebox_marker,distance=..0.1,limit=1] imd_player_id run stopsound @s record minecraft:music_disc.$(name)
+execute if data entity @s data.Listeners[0] run function {datapack_name}:disc_stop with storage {datapack_name}:global lookup.disc
+"""
+}
+
+
+
+# See src.contents.datapack.v2p0 for info on this class structure
+# v2.2 replaces every per-disc file with one macro function, so the
+#   number of files no longer grows with the number of discs
+# It drops the per-disc give_<name> functions players may already
+#   use, so it's only picked when the macro_datapack option is set
+class DatapackContents_v2p2(DatapackContents_v2p1):
+
+    min_pack_format = 18
+    version_major = 2
+    version_minor = 2
+    opt_in = 'macro_datapack'
+
+    supports_macros = True
+
+    def add_contents(self):
+        super().add_contents()
+
+        self.give_all_discs = give_all_discs
+        self.give_disc = give_disc
+        self.help = help
+        self.load_disc = load_disc
+        self.play = play
+        self.play_duration = play_duration
+        self.register_discs = register_discs
+        self.set_disc_track = set_disc_track
+        self.setup_load = setup_load
+        self.stop = stop
+        self.disc_give = disc_give
+        self.disc_play = disc_play
+        self.disc_play_duration = disc_play_duration
+        self.disc_set_track = disc_set_track
+        self.disc_stop = disc_stop
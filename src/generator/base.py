@@ -6,21 +6,23 @@
 import os
 import shutil
 import pyffmpeg
-import tempfile
 import multiprocessing
 
 from typing import Callable
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
 
-from contextlib import contextmanager
 from mutagen import MutagenError
 from mutagen.mp3 import MP3, HeaderNotFoundError
 from mutagen.oggvorbis import OggVorbis
-from src.definitions import Status, IMDException, DiscListContents, DiscListEntryContents, MpTaskContents
+from src.definitions import Constants, Status, IMDException, DiscListContents, DiscListEntryContents, MpTaskContents
+from src.generator.scratch import ScratchSpace, estimate_convert_bytes, user_cache_dir
+from src.generator.texture import png_size, is_power_of_two, process_textures
 
 
 
 class VirtualGenerator():
     def __init__(self):
+        self.scratch = ScratchSpace()
         self.tmp_path = None
 
     def validate(self, entry_list: DiscListContents, settings={}):
@@ -47,6 +49,16 @@ class VirtualGenerator():
             if(not ( '.png' in e.texture_file )):
                 raise IMDException(Status.BAD_IMAGE_TYPE)
 
+            #the game expects item textures to be power-of-two sized
+            size = png_size(e.texture_file)
+            if(size is not None and not all([is_power_of_two(n) for n in size])):
+                print(f"Warning: {e.texture_file} is {size[0]}x{size[1]}. Item textures should be a power of two in size (16x16, 32x32, ...).")
+
+            #non-square textures are downscaled without stretching,
+            #  but the game still expects a square item texture
+            if(size is not None and size[0] != size[1]):
+                print(f"Warning: {e.texture_file} is {size[0]}x{size[1]}. Item textures should be square.")
+
             #track is provided
             if(e.track_file == ''):
                 raise IMDException(Status.TRACK_FILE_NOT_GIVEN)
@@ -83,16 +95,40 @@ class VirtualGenerator():
 
 
 
-    def create_tmp(self):
-        if self.tmp_path != None:
-            shutil.rmtree(self.tmp_path)
+    def create_tmp(self, settings={}):
+        self.scratch.cleanup()
+        self.scratch = ScratchSpace(settings.get('tmp_dir', ''))
+        self.scratch.create()
 
-        self.tmp_path = tempfile.mkdtemp()
+        self.tmp_path = self.scratch.path
 
     def cleanup_tmp(self):
-        if self.tmp_path != None:
-            shutil.rmtree(self.tmp_path, ignore_errors=True)
-            self.tmp_path = None
+        self.scratch.cleanup()
+        self.tmp_path = None
+
+    # estimate how much space track conversion and pack generation
+    #   will need, and fail early with a clear error instead of
+    #   running out of space halfway through
+    def check_disk_space(self, entry_list: DiscListContents, settings={}):
+        track_sizes = [os.path.getsize(f) for f in entry_list.track_files]
+        texture_sizes = [os.path.getsize(f) for f in entry_list.texture_files]
+
+        num_workers = 1
+        if settings.get('par_proc', False):
+            num_workers = multiprocessing.cpu_count()
+
+        tmp_bytes = estimate_convert_bytes(track_sizes, num_workers)
+        self.scratch.check_budget(tmp_bytes)
+
+        #packs are written to the working directory; zipping needs room
+        #  for the archive alongside the pack folder
+        out_bytes = sum(track_sizes) + sum(texture_sizes)
+        if settings.get('zip', False):
+            out_bytes *= 2
+
+        out_bytes = int(out_bytes * Constants.SCRATCH_MARGIN)
+        if shutil.disk_usage(os.getcwd()).free < out_bytes:
+            raise IMDException(Status.OUTPUT_NO_SPACE)
 
 
 
@@ -149,8 +185,14 @@ class VirtualGenerator():
         # prepare input file
         track_ext = track.split('/')[-1].split('.')[-1]
         tmp_track = os.path.join(self.tmp_path, internal_name + '.tmp.' + track_ext)
+
         shutil.copyfile(track, tmp_track)
 
+        #keep the source's timestamps, so a track that's copied into the
+        #  pack unchanged is recognized without hashing it
+        st = os.stat(track)
+        os.utime(tmp_track, ns=(st.st_atime_ns, st.st_mtime_ns))
+
         #strip any ID3 metadata from mp3
         if '.mp3' in tmp_track:
             try:
@@ -184,8 +226,10 @@ class VirtualGenerator():
         # copy by default, since FFmpeg sometimes fails to convert files,
         #   and that causes pack generation to fail. Copying is more likely
         #   to work
+        #the stripped input copy is only needed until this point, so move
+        #  it instead of copying it
         if(not data.proc_ogg and ".ogg" in data.tmp_track):
-            shutil.copyfile(data.tmp_track, data.out_track)
+            os.replace(data.tmp_track, data.out_track)
             return
 
         #convert file
@@ -196,6 +240,9 @@ class VirtualGenerator():
             print(e)
             raise IMDException(Status.FFMPEG_CONVERT_FAIL)
 
+        #release the stripped input copy now that the track is converted
+        self.scratch.release(data.tmp_track)
+
         #FIXME: uniquify exceptions
         #exit if file was not converted successfully
         if not os.path.isfile(data.out_track):
@@ -206,18 +253,16 @@ class VirtualGenerator():
 
 
 
-    # context manager to simplify moving around the directory
-    #   structure while generating packs. Automatically chdir's
-    #   to the original directory upon exit
-    @contextmanager
-    def set_directory(self, path: str):
-        orig_dir = os.getcwd()
-        try:
-            os.chdir(path)
-            yield
+    # scale down and optimize textures for the chosen item resolution,
+    #   and point the entry list at the processed files
+    def process_all_textures(self, entry_list: DiscListContents, settings={}):
+        texture_files = process_textures(entry_list.texture_files, settings.get('texture_size', 0),
+                                         os.path.join(user_cache_dir(), Constants.TEXTURE_CACHE_DIR))
+
+        for (f, e) in zip(texture_files, entry_list.entries):
+            e.texture_file = f
+
 
-        finally:
-            os.chdir(orig_dir)
 
     # detect track length so that the datapack can indicate
     #   a disc is done playing. Because IMD overrides disc "11"
@@ -249,6 +294,46 @@ class VirtualGenerator():
     def sanitize(self, track_entry: DiscListEntryContents):
         return track_entry.title.replace('"', '＂')
 
+    # assign the per-disc values that both packs depend on, so the
+    #   datapack and resourcepack always agree on them
+    def assign_entry_data(self, entry_list: DiscListContents, settings={}):
+        entry_list.assign_custom_model_data(settings.get('offset', 0))
+
+    # generate the datapack and resourcepack at the same time. The
+    #   datapack is mostly small text files and the resourcepack is
+    #   mostly large asset copies, so their I/O overlaps well
+    # pack_cb runs on the calling thread once per finished pack
+    # a process that builds many packs at once can pass in one shared
+    #   pool instead of starting two threads per generation
+    def generate_packs(self, entry_list: DiscListContents, settings: dict, pack_cb: Callable, pool: Executor = None):
+        self.assign_entry_data(entry_list, settings)
+
+        own_pool = pool is None
+        if own_pool:
+            pool = ThreadPoolExecutor(max_workers=2)
+
+        try:
+            futures = [
+                pool.submit(self.generate_datapack, entry_list, settings),
+                pool.submit(self.generate_resourcepack, entry_list, settings)
+            ]
+
+            #let both packs finish before reporting an error, so
+            #  neither pack writer is left open
+            errors = []
+            for f in as_completed(futures):
+                if f.exception() is not None:
+                    errors.append(f.exception())
+                else:
+                    pack_cb()
+
+        finally:
+            if own_pool:
+                pool.shutdown()
+
+        if len(errors) > 0:
+            raise errors[0]
+
     def generate_datapack(self):
         raise NotImplementedError
 
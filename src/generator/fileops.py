@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+#Infinite Music Discs file transfer module
+#Generation tool, datapack design, and resourcepack design by link2_thepast
+
+import os
+import sys
+import errno
+import shutil
+
+#fcntl only exists on Unix-like systems
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+#ioctl request number for FICLONE, from linux/fs.h
+FICLONE = 0x40049409
+
+
+
+# ask the filesystem to share the data blocks of src with a new
+#   file at dst (copy-on-write), instead of copying them
+# only supported on Linux, on filesystems like btrfs and XFS
+# returns False if the clone could not be made
+def reflink_file(src: str, dst: str) -> bool:
+    if fcntl is None or not sys.platform.startswith('linux'):
+        return False
+
+    try:
+        with open(src, 'rb') as f_src, open(dst, 'wb') as f_dst:
+            fcntl.ioctl(f_dst.fileno(), FICLONE, f_src.fileno())
+
+    except OSError:
+        #leave no empty file behind for the copy fallback to trip over
+        if os.path.exists(dst):
+            os.remove(dst)
+
+        return False
+
+    return True
+
+# place the file at src at dst using the cheapest operation the
+#   filesystem supports
+# if move is set, src is an intermediate file that nobody needs
+#   afterwards, so it can be renamed into place or hardlinked.
+#   Otherwise src is left untouched and gets reflinked or copied
+# hardlinks and reflinks can't cross devices either, so when a rename
+#   fails with EXDEV the file is copied straight away
+def place_file(src: str, dst: str, move: bool = False):
+    if move:
+        try:
+            os.replace(src, dst)
+            return
+
+        #src and dst are on different devices
+        except OSError as e:
+            if e.errno == errno.EXDEV:
+                shutil.copyfile(src, dst)
+                os.remove(src)
+                return
+
+            #the filesystem doesn't allow renames here
+            if e.errno not in [errno.EPERM, errno.EACCES, errno.EOPNOTSUPP]:
+                raise
+
+        try:
+            os.link(src, dst)
+            os.remove(src)
+            return
+
+        except OSError:
+            pass
+
+    if reflink_file(src, dst):
+        if move:
+            os.remove(src)
+        return
+
+    shutil.copyfile(src, dst)
+
+    if move:
+        os.remove(src)
+
+# give dst the same contents as src, which is left untouched and
+#   won't be written to afterwards, so the two can share their data
+# hardlinks are tried first, then reflinks, then a plain copy
+def share_file(src: str, dst: str):
+    try:
+        os.link(src, dst)
+        return
+
+    except OSError:
+        pass
+
+    place_file(src, dst)
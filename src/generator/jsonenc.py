@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+#
+#Infinite Music Discs JSON encoder module
+#Generation tool, datapack design, and resourcepack design by link2_thepast
+
+import json
+
+#orjson is much faster than the built-in encoder, but optional
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+
+# serialize a pack file's JSON contents
+# packs are compact by default: no indentation or spaces after
+#   separators, since every byte is downloaded and parsed by the
+#   game. Pretty-printing is only meant for reading generated packs
+# compact output is the same with or without orjson
+def dumps(obj, pretty: bool = False) -> str:
+    if pretty:
+        return json.dumps(obj, indent=4)
+
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode('utf-8')
+
+        #orjson is stricter about strings than json (e.g. lone
+        #  surrogates), leave those to the built-in encoder
+        except orjson.JSONEncodeError:
+            pass
+
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
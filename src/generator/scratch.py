@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+#Infinite Music Discs scratch space module
+#Generation tool, datapack design, and resourcepack design by link2_thepast
+
+import os
+import sys
+import shutil
+import tempfile
+
+from src.definitions import Constants, Status, IMDException
+
+
+
+# Manages the temporary directory that holds intermediate files
+#   (stripped input copies, converted .oggs) while packs are generated.
+# The scratch directory can live in the system temp folder, next to
+#   the app, in a RAM disk, or in any user-provided directory
+class ScratchSpace():
+    def __init__(self, location: str = ''):
+        self.location = location
+        self.path = None
+
+    # resolve the configured location to a parent directory
+    #   for the scratch directory
+    @property
+    def root(self) -> str:
+        #system temp folder
+        if self.location == '':
+            return tempfile.gettempdir()
+
+        #RAM disk, if this system has one
+        #fall back to the system temp folder otherwise
+        if self.location == Constants.SCRATCH_RAMDISK:
+            for d in Constants.RAMDISK_DIRS:
+                if os.path.isdir(d) and os.access(d, os.W_OK):
+                    return d
+
+            print("Warning: No RAM disk found. Intermediate files will be stored in the system temp folder.")
+            return tempfile.gettempdir()
+
+        #folder next to the app
+        if self.location == Constants.SCRATCH_LOCAL:
+            os.makedirs(self.location, exist_ok=True)
+
+        #user-provided directory
+        if not os.path.isdir(self.location):
+            raise IMDException(Status.TMP_DIR_MISSING)
+
+        return self.location
+
+    @property
+    def free_bytes(self) -> int:
+        return shutil.disk_usage(self.path or self.root).free
+
+    def create(self):
+        if self.path != None:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+        #always keep an absolute path, so files in here can be found no
+        #  matter which directory the generators are writing to
+        try:
+            self.path = os.path.abspath(tempfile.mkdtemp(prefix=Constants.SCRATCH_PREFIX, dir=self.root))
+        except OSError:
+            raise IMDException(Status.TMP_DIR_MISSING)
+
+    def cleanup(self):
+        if self.path != None:
+            shutil.rmtree(self.path, ignore_errors=True)
+            self.path = None
+
+        #the folder next to the app is only there for scratch space,
+        #  so don't leave it behind once it's empty
+        if self.location == Constants.SCRATCH_LOCAL:
+            try:
+                os.rmdir(self.location)
+            except OSError:
+                pass
+
+    # delete an intermediate file as soon as the stage that
+    #   needed it is done, instead of waiting for cleanup()
+    def release(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    # check whether the given file is an intermediate file
+    #   stored in this scratch directory
+    def owns(self, path: str) -> bool:
+        if self.path == None:
+            return False
+
+        return os.path.dirname(os.path.abspath(path)) == self.path
+
+    # raise before any expensive work starts if the scratch
+    #   directory can't hold the estimated number of bytes
+    def check_budget(self, needed: int):
+        if needed > self.free_bytes:
+            raise IMDException(Status.TMP_NO_SPACE)
+
+
+
+# folder for files kept between runs, like processed textures
+# unlike scratch space, this is never in a RAM disk and isn't deleted
+#   when generation finishes
+def user_cache_dir() -> str:
+    if sys.platform.startswith('win'):
+        base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), 'AppData', 'Local')
+    elif sys.platform == 'darwin':
+        base = os.path.join(os.path.expanduser('~'), 'Library', 'Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+
+    return os.path.join(base, Constants.USER_CACHE_DIR)
+
+# estimate the peak scratch usage of converting the given tracks
+# every converted track stays in scratch until the resourcepack is
+#   written, but each stripped input copy is released as soon as its
+#   conversion finishes, so only the copies that are in flight at the
+#   same time count towards the peak
+def estimate_convert_bytes(track_sizes: list, num_workers: int = 1) -> int:
+    if len(track_sizes) == 0:
+        return 0
+
+    #converted .ogg files are assumed to be no larger than their source
+    #  (true for wav, about equal for mp3 and ogg)
+    out_bytes = sum(track_sizes)
+    in_flight_bytes = sum(sorted(track_sizes, reverse=True)[:max(num_workers, 1)])
+
+    return int((out_bytes + in_flight_bytes) * Constants.SCRATCH_MARGIN)
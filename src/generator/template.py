@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+#
+#Infinite Music Discs template compiler module
+#Generation tool, datapack design, and resourcepack design by link2_thepast
+
+import os
+
+from string import Formatter
+from src.generator.jsonenc import dumps
+
+
+
+# Templates from contents.datapack are str.format() strings, or JSON
+#   dicts containing str.format() strings. Instead of re-parsing every
+#   template for every disc, templates are compiled once into a tree
+#   of literal text and replacement fields
+# Compiling happens in two stages:
+#   compile: parse the template, once per datapack version
+#   bind:    fill in the fields that are the same for every disc
+#            (datapack_name, dp_version_str, ...), once per pack
+# After binding, rendering a template for a disc only has to look up
+#   the per-disc 'entry' fields
+
+# name of the per-disc replacement field root
+ENTRY_FIELD = 'entry'
+
+
+
+# A replacement field like '{entry.title}', split into its root name
+#   ('entry'), attribute chain (['title']), conversion and format spec
+class Field():
+    def __init__(self, name: str, conversion: str, spec: str):
+        if '[' in name:
+            raise ValueError(f"Unsupported template field: {name}")
+
+        root, *attrs = name.split('.')
+
+        self.root = root
+        self.attrs = attrs
+        self.conversion = conversion
+        self.spec = spec
+
+    def resolve(self, obj) -> str:
+        for a in self.attrs:
+            obj = getattr(obj, a)
+
+        if self.conversion == 'r':
+            obj = repr(obj)
+        elif self.conversion == 'a':
+            obj = ascii(obj)
+        elif self.conversion == 's':
+            obj = str(obj)
+
+        return format(obj, self.spec)
+
+
+
+# A compiled format string: a list of literal strings and Fields
+class CompiledStr():
+    def __init__(self, parts: list):
+        self.parts = parts
+
+    @classmethod
+    def compile(cls, fmt: str):
+        parts = []
+
+        for literal, name, spec, conversion in Formatter().parse(fmt):
+            if literal:
+                parts.append(literal)
+
+            if name is not None:
+                parts.append(Field(name, conversion, spec))
+
+        return cls(parts)
+
+    @property
+    def is_static(self) -> bool:
+        return all(type(p) == str for p in self.parts)
+
+    # resolve every field not rooted at 'entry' using ctx, merging
+    #   neighboring literal strings together
+    def bind(self, ctx: dict):
+        parts = []
+
+        for p in self.parts:
+            if type(p) == Field and not p.root == ENTRY_FIELD:
+                p = p.resolve(ctx[p.root])
+
+            if type(p) == str and len(parts) > 0 and type(parts[-1]) == str:
+                parts[-1] += p
+            else:
+                parts.append(p)
+
+        return CompiledStr(parts)
+
+    def render(self, entry) -> str:
+        if len(self.parts) == 1 and type(self.parts[0]) == str:
+            return self.parts[0]
+
+        return ''.join([p if type(p) == str else p.resolve(entry) for p in self.parts])
+
+
+
+# Nodes of a compiled JSON template. Subtrees without any replacement
+#   fields collapse into a single JsonConst, which is returned as-is
+#   instead of being rebuilt for every disc
+class JsonConst():
+    is_static = True
+
+    def __init__(self, value):
+        self.value = value
+
+    def bind(self, ctx: dict):
+        return self
+
+    def render(self, entry):
+        return self.value
+
+class JsonStr():
+    is_static = False
+
+    def __init__(self, fmt: CompiledStr):
+        self.fmt = fmt
+
+    def bind(self, ctx: dict):
+        fmt = self.fmt.bind(ctx)
+
+        if fmt.is_static:
+            return JsonConst(fmt.render(None))
+
+        return JsonStr(fmt)
+
+    def render(self, entry):
+        return self.fmt.render(entry)
+
+class JsonDict():
+    is_static = False
+
+    def __init__(self, items: list):
+        self.items = items
+
+    def bind(self, ctx: dict):
+        return json_node(dict, [(k, v.bind(ctx)) for k, v in self.items])
+
+    def render(self, entry):
+        return {k: v.render(entry) for k, v in self.items}
+
+class JsonList():
+    is_static = False
+
+    def __init__(self, items: list):
+        self.items = items
+
+    def bind(self, ctx: dict):
+        return json_node(list, [(i, v.bind(ctx)) for i, v in self.items])
+
+    def render(self, entry):
+        return [v.render(entry) for i, v in self.items]
+
+# build a container node, or a constant if none of
+#   its children have replacement fields left
+def json_node(container: type, items: list):
+    if all(v.is_static for k, v in items):
+        if container == dict:
+            return JsonConst({k: v.value for k, v in items})
+        else:
+            return JsonConst([v.value for k, v in items])
+
+    if container == dict:
+        return JsonDict(items)
+    else:
+        return JsonList(items)
+
+# recursively compile every string in the given JSON dict or list
+def compile_json(obj):
+    if type(obj) == str:
+        fmt = CompiledStr.compile(obj)
+        return JsonConst(obj.format()) if fmt.is_static else JsonStr(fmt)
+
+    elif type(obj) == dict:
+        return json_node(dict, [(k, compile_json(v)) for k, v in obj.items()])
+
+    elif type(obj) == list:
+        return json_node(list, [(i, compile_json(v)) for i, v in enumerate(obj)])
+
+    return JsonConst(obj)
+
+
+
+# A compiled datapack file from contents.datapack
+# dispatch holds the optional format strings that let a copy_within
+#   file be written as a dispatch tree (see GeneratorV2)
+class CompiledTemplate():
+    def __init__(self, repeat: str, path: list, contents, is_json: bool, pretty: bool = False, dispatch: dict = None):
+        self.repeat = repeat
+        self.path = path
+        self.contents = contents
+        self.is_json = is_json
+        self.pretty = pretty
+        self.dispatch = dispatch
+        self.text = None
+
+    @classmethod
+    def compile(cls, src: dict):
+        path = [CompiledStr.compile(p) for p in src['path']]
+        fmt_contents = src.get('format_contents', True)
+
+        dispatch = src.get('dispatch', None)
+        if dispatch is not None:
+            dispatch = {k: CompiledStr.compile(v) for k, v in dispatch.items()}
+
+        if type(src['contents']) == str:
+            contents = src['contents'].lstrip()
+            contents = CompiledStr.compile(contents) if fmt_contents else CompiledStr([contents])
+            return cls(src['repeat'], path, contents, False, dispatch=dispatch)
+
+        else:
+            contents = compile_json(src['contents']) if fmt_contents else JsonConst(src['contents'])
+            return cls(src['repeat'], path, contents, True, dispatch=dispatch)
+
+    # fill in the per-pack fields. If nothing per-disc is left, the
+    #   file text is rendered once here and reused
+    # pretty decides how JSON files are serialized for this pack
+    def bind(self, ctx: dict, pretty: bool = False):
+        path = [p.bind(ctx) for p in self.path]
+        contents = self.contents.bind(ctx)
+
+        dispatch = self.dispatch
+        if dispatch is not None:
+            dispatch = {k: v.bind(ctx) for k, v in dispatch.items()}
+
+        bound = CompiledTemplate(self.repeat, path, contents, self.is_json, pretty, dispatch)
+
+        if contents.is_static:
+            bound.text = bound.render_contents(None)
+
+        return bound
+
+    def render_path(self, entry) -> str:
+        return os.path.join(*[p.render(entry) for p in self.path])
+
+    def render_contents(self, entry) -> str:
+        if self.text is not None:
+            return self.text
+
+        if self.is_json:
+            return dumps(self.contents.render(entry), self.pretty)
+        else:
+            return self.contents.render(entry)
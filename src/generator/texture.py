@@ -0,0 +1,602 @@
+# -*- coding: utf-8 -*-
+#
+#Infinite Music Discs texture processing module
+#Generation tool, datapack design, and resourcepack design by link2_thepast
+
+import os
+import json
+import time
+import zlib
+import struct
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+
+#numpy is optional; without it textures are copied as-is
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from src.definitions import Constants
+from src.generator.writer import hash_file
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+#samples per pixel for each PNG color type
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+#chunks needed to display a PNG, every other chunk is dropped
+PNG_KEPT_CHUNKS = [b'IHDR', b'PLTE', b'tRNS', b'IDAT', b'IEND']
+
+
+
+# Disc textures are often full-size album covers, far larger than an
+#   item texture needs to be, and often carry large ancillary chunks
+#   (text, EXIF, color profiles, ...) the game never reads. Before
+#   they're packed:
+#   - every texture has its ancillary chunks stripped
+#   - small textures, and textures larger than the chosen item
+#     resolution, are decoded and re-encoded losslessly as the smallest
+#     PNG this module can make. Larger textures are downscaled first
+#   - large textures that keep their size only have their chunks
+#     stripped, since decoding them is slow
+# Decoding, resampling and encoding are all done with numpy, without
+#   any image library. Textures of the same size are resampled together
+#   as one batch. Without numpy, textures are only stripped
+# Results are cached in the user's cache folder by the hash of the
+#   source file, so unchanged textures are only processed once. The
+#   least recently used results are deleted once the cache grows past
+#   its size limit
+# The cache also keeps an index of the size and modification time of
+#   every source file it has hashed, so unchanged sources aren't hashed
+#   again
+
+
+
+# read the size of a PNG from its header without decoding it
+# returns None if the file isn't a PNG
+def png_size(path: str):
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(24)
+
+    except OSError:
+        return None
+
+    if len(header) < 24 or not header.startswith(PNG_SIGNATURE) or not header[12:16] == b'IHDR':
+        return None
+
+    return struct.unpack('>II', header[16:24])
+
+def is_power_of_two(n: int) -> bool:
+    return n > 0 and (n & (n - 1)) == 0
+
+
+
+# split a PNG into its header fields and the chunks needed to decode it.
+#   Every other chunk is dropped
+def read_chunks(data: bytes):
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file")
+
+    pos = len(PNG_SIGNATURE)
+    ihdr = None
+    plte = None
+    trns = None
+    idat = []
+
+    while pos + 8 <= len(data):
+        length, ctype = struct.unpack('>I4s', data[pos:pos+8])
+        body = data[pos+8:pos+8+length]
+        pos += length + 12
+
+        if ctype == b'IHDR':
+            ihdr = struct.unpack('>IIBBBBB', body)
+        elif ctype == b'PLTE':
+            plte = body
+        elif ctype == b'tRNS':
+            trns = body
+        elif ctype == b'IDAT':
+            idat.append(body)
+        elif ctype == b'IEND':
+            break
+
+    if ihdr is None or len(idat) == 0:
+        raise ValueError("PNG is missing IHDR or IDAT")
+
+    return ihdr, plte, trns, b''.join(idat)
+
+# copy a PNG without its ancillary chunks. Nothing is decoded, so
+#   this is cheap for any size of image
+def strip_png(data: bytes) -> bytes:
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file")
+
+    pos = len(PNG_SIGNATURE)
+    chunks = [PNG_SIGNATURE]
+
+    while pos + 8 <= len(data):
+        length, ctype = struct.unpack('>I4s', data[pos:pos+8])
+        end = pos + length + 12
+
+        if ctype in PNG_KEPT_CHUNKS:
+            chunks.append(data[pos:end])
+
+        pos = end
+
+        if ctype == b'IEND':
+            break
+
+    return b''.join(chunks)
+
+# undo the per-row PNG filters
+# Sub, Average and Paeth predict each byte from the byte one pixel to
+#   the left, so a row can't be decoded all at once. Instead, pixels are
+#   decoded along anti-diagonals: every pixel on a diagonal only depends
+#   on pixels from the two diagonals before it, so each diagonal is one
+#   vectorized step, whatever mix of filters the rows use
+def unfilter(raw: bytes, height: int, stride: int, bpp: int):
+    rows = np.frombuffer(raw, dtype=np.uint8, count=height * (stride + 1)).reshape(height, stride + 1)
+    filters = rows[:, 0].astype(np.int32)
+
+    if filters.max() > 4:
+        raise ValueError("Bad PNG filter type")
+
+    width = stride // bpp
+    x = rows[:, 1:].astype(np.int32).reshape(height, width, bpp)
+
+    #without Average or Paeth rows, Sub is a running sum along the row,
+    #  so decoding row by row is enough
+    if filters.max() <= 2:
+        out = np.zeros((height + 1, width, bpp), dtype=np.int32)
+
+        for r in range(height):
+            if filters[r] == 1:
+                out[r + 1] = np.cumsum(x[r], axis=0) & 0xFF
+            elif filters[r] == 2:
+                out[r + 1] = (x[r] + out[r]) & 0xFF
+            else:
+                out[r + 1] = x[r]
+
+        return out[1:].reshape(height, stride).astype(np.uint8)
+
+    #pad with a row and column of zeros for the pixels outside the image
+    out = np.zeros((height + 1, width + 1, bpp), dtype=np.int32)
+
+    for k in range(height + width - 1):
+        r = np.arange(max(0, k - width + 1), min(height - 1, k) + 1)
+        c = k - r
+
+        a = out[r + 1, c]
+        b = out[r, c + 1]
+        ul = out[r, c]
+        f = filters[r][:, None]
+
+        p = a + b - ul
+        pa = np.abs(p - a)
+        pb = np.abs(p - b)
+        pc = np.abs(p - ul)
+        paeth = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, ul))
+
+        pred = np.select([f == 1, f == 2, f == 3, f == 4], [a, b, (a + b) >> 1, paeth], 0)
+        out[r + 1, c + 1] = (x[r, c] + pred) & 0xFF
+
+    return out[1:, 1:].reshape(height, stride).astype(np.uint8)
+
+# decode PNG data into an 8-bit RGBA array of shape (height, width, 4)
+def decode_png(data: bytes):
+    (width, height, depth, ctype, compression, filter_method, interlace), plte, trns, idat = read_chunks(data)
+
+    if ctype not in PNG_CHANNELS or interlace != 0:
+        raise ValueError("Unsupported PNG format")
+
+    channels = PNG_CHANNELS[ctype]
+    bits = depth * channels
+    stride = (width * bits + 7) // 8
+    bpp = max(1, bits // 8)
+
+    pixels = unfilter(zlib.decompress(idat), height, stride, bpp)
+
+    #split rows into samples
+    if depth == 16:
+        samples = pixels.reshape(height, width * channels, 2).astype(np.uint32)
+        samples = (samples[:, :, 0] << 8) | samples[:, :, 1]
+    elif depth == 8:
+        samples = pixels.astype(np.uint32)
+    else:
+        shifts = np.arange(8 - depth, -1, -depth, dtype=np.uint32)
+        samples = (pixels[:, :, None].astype(np.uint32) >> shifts) & ((1 << depth) - 1)
+        samples = samples.reshape(height, -1)[:, :width * channels]
+
+    samples = samples.reshape(height, width, channels)
+    max_value = (1 << depth) - 1
+
+    #palette images look up colors and alpha by index
+    if ctype == 3:
+        palette = np.frombuffer(plte, dtype=np.uint8).reshape(-1, 3)
+        alpha = np.full(len(palette), 255, dtype=np.uint8)
+
+        if trns is not None:
+            alpha[:len(trns)] = np.frombuffer(trns, dtype=np.uint8)[:len(palette)]
+
+        index = np.minimum(samples[:, :, 0], len(palette) - 1)
+        return np.concatenate([palette[index], alpha[index][:, :, None]], axis=2)
+
+    color = samples[:, :, :3] if ctype in [2, 6] else np.repeat(samples[:, :, :1], 3, axis=2)
+
+    if ctype in [4, 6]:
+        alpha = samples[:, :, -1:]
+    else:
+        alpha = np.full((height, width, 1), max_value, dtype=np.uint32)
+
+        #tRNS marks a single color as fully transparent
+        if trns is not None:
+            key = np.array(struct.unpack(f'>{len(trns) // 2}H', trns), dtype=np.uint32)
+            alpha[np.all(samples == key, axis=2)] = 0
+
+    rgba = np.concatenate([color, alpha], axis=2)
+
+    if depth == 8:
+        return rgba.astype(np.uint8)
+
+    return ((rgba * 255 + max_value // 2) // max_value).astype(np.uint8)
+
+
+
+def srgb_to_linear(v):
+    return np.where(v <= 0.04045, v / 12.92, ((v + 0.055) / 1.055) ** 2.4)
+
+def linear_to_srgb(v):
+    return np.where(v <= 0.0031308, v * 12.92, 1.055 * np.power(v, 1 / 2.4) - 0.055)
+
+# weights for area (box) resampling from src pixels down to dst pixels
+#   along one axis. Each output pixel averages the input pixels it
+#   covers, weighted by how much of each one it covers
+def area_weights(src: int, dst: int):
+    edges = np.arange(dst + 1) * (src / dst)
+    lo = edges[:-1, None]
+    hi = edges[1:, None]
+    j = np.arange(src)[None, :]
+
+    overlap = np.clip(np.minimum(hi, j + 1) - np.maximum(lo, j), 0, None)
+    return (overlap / (src / dst)).astype(np.float32)
+
+# downscale a batch of same-sized RGBA images, shape (n, h, w, 4), to
+#   fit in size x size, keeping their aspect ratio. Colors are averaged
+#   in linear light and weighted by alpha, so transparent pixels don't
+#   bleed dark fringes into the edges
+def resize_batch(images, size: int):
+    n, height, width, _ = images.shape
+    images = images.astype(np.float32) / 255
+
+    scale = size / max(height, width)
+    out_height = max(1, round(height * scale))
+    out_width = max(1, round(width * scale))
+
+    alpha = images[:, :, :, 3:]
+    premul = np.concatenate([srgb_to_linear(images[:, :, :, :3]) * alpha, alpha], axis=3)
+
+    out = np.einsum('yh,nhwc,xw->nyxc', area_weights(height, out_height), premul, area_weights(width, out_width), optimize=True)
+
+    alpha = out[:, :, :, 3:]
+    color = np.where(alpha > 0, out[:, :, :, :3] / np.maximum(alpha, 1e-12), 0)
+    out = np.concatenate([linear_to_srgb(np.clip(color, 0, 1)), alpha], axis=3)
+
+    return np.rint(np.clip(out, 0, 1) * 255).astype(np.uint8)
+
+
+
+# apply one PNG filter type to every row of an image
+def filter_rows(pixels, bpp: int, ftype: int):
+    x = pixels.astype(np.int32)
+    a = np.zeros_like(x)
+    b = np.zeros_like(x)
+    a[:, bpp:] = x[:, :-bpp]
+    b[1:] = x[:-1]
+
+    if ftype == 0:
+        pred = 0
+    elif ftype == 1:
+        pred = a
+    elif ftype == 2:
+        pred = b
+    elif ftype == 3:
+        pred = (a + b) >> 1
+    else:
+        ul = np.zeros_like(x)
+        ul[1:, bpp:] = x[:-1, :-bpp]
+
+        p = a + b - ul
+        pa = np.abs(p - a)
+        pb = np.abs(p - b)
+        pc = np.abs(p - ul)
+        pred = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, ul))
+
+    filtered = ((x - pred) & 0xFF).astype(np.uint8)
+    return np.concatenate([np.full((len(x), 1), ftype, dtype=np.uint8), filtered], axis=1)
+
+def png_chunk(ctype: bytes, body: bytes) -> bytes:
+    return struct.pack('>I', len(body)) + ctype + body + struct.pack('>I', zlib.crc32(ctype + body))
+
+# encode an 8-bit RGBA array as the smallest PNG this encoder can make
+#   without losing anything: the fewest channels the image needs (or a
+#   palette) and the best-compressing filter type
+def encode_png(rgba) -> bytes:
+    height, width, _ = rgba.shape
+
+    opaque = bool(np.all(rgba[:, :, 3] == 255))
+    gray = bool(np.all(rgba[:, :, 0] == rgba[:, :, 1]) and np.all(rgba[:, :, 1] == rgba[:, :, 2]))
+
+    if gray:
+        ctype, samples = (0, rgba[:, :, :1]) if opaque else (4, rgba[:, :, [0, 3]])
+    else:
+        ctype, samples = (2, rgba[:, :, :3]) if opaque else (6, rgba)
+
+    candidates = [(ctype, samples, b'')]
+
+    #images with few colors can use a palette instead
+    colors, index = np.unique(rgba.reshape(-1, 4), axis=0, return_inverse=True)
+    if len(colors) <= 256:
+        extra = png_chunk(b'PLTE', colors[:, :3].tobytes())
+
+        if not opaque:
+            extra += png_chunk(b'tRNS', colors[:, 3].tobytes())
+
+        candidates.append((3, index.reshape(height, width, 1).astype(np.uint8), extra))
+
+    best = None
+    for ctype, samples, extra in candidates:
+        bpp = samples.shape[2]
+        pixels = samples.reshape(height, width * bpp)
+
+        for ftype in range(5):
+            idat = zlib.compress(filter_rows(pixels, bpp, ftype).tobytes(), 9)
+
+            if best is None or len(extra) + len(idat) < len(best[1]) + len(best[2]):
+                best = (ctype, extra, idat)
+
+    ctype, extra, idat = best
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, ctype, 0, 0, 0)
+
+    return PNG_SIGNATURE + png_chunk(b'IHDR', ihdr) + extra + png_chunk(b'IDAT', idat) + png_chunk(b'IEND', b'')
+
+
+
+# process every texture for the given item resolution (0 keeps the
+#   original size) and return the paths of the processed files, in
+#   the same order. Textures that can't be processed are used as-is
+# processed textures are cached in cache_dir
+def process_textures(textures: list, size: int, cache_dir: str) -> list:
+    if np is None and size > 0:
+        print("Warning: numpy is not installed. Textures will be packed without resizing.")
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    except OSError:
+        print(f"Warning: Couldn't create texture cache {cache_dir}. Textures will be packed as-is.")
+        return list(textures)
+
+    results = {}
+
+    index_path = os.path.join(cache_dir, Constants.TEXTURE_CACHE_INDEX)
+    index = read_index(index_path)
+
+    # find the hash of a texture, from the index if the file hasn't
+    #   changed since it was last hashed
+    def digest_of(src):
+        st = os.stat(src)
+        stats = [st.st_size, st.st_mtime_ns]
+
+        entry = index.get(os.path.abspath(src))
+        if entry is not None and entry[:2] == stats:
+            return entry[2]
+
+        return hash_file(src)
+
+    with ThreadPoolExecutor() as pool:
+        #the same image may be used by several discs, even from
+        #  different files, so textures are told apart by contents
+        digests = dict(zip(textures, pool.map(digest_of, textures)))
+
+        for src in textures:
+            st = os.stat(src)
+            index[os.path.abspath(src)] = [st.st_size, st.st_mtime_ns, digests[src]]
+
+        unique = {}
+        for src in textures:
+            unique.setdefault(digests[src], src)
+
+        todo = []
+        for digest, src in unique.items():
+            dst = os.path.join(cache_dir, f'{digest}_{size}.png')
+
+            if os.path.isfile(dst):
+                #mark the entry as recently used. Only the access time
+                #  changes, so packs can tell the file hasn't
+                os.utime(dst, ns=(time.time_ns(), os.stat(dst).st_mtime_ns))
+                results[digest] = dst
+            else:
+                todo.append((digest, src, dst))
+
+        #group textures to decode by size so each group resamples as
+        #  one batch. The rest are only stripped
+        groups = {}
+        strip = []
+        for digest, src, dst in todo:
+            shape = png_size(src)
+
+            if needs_decode(shape, size):
+                groups.setdefault(shape, []).append((digest, src, dst))
+            else:
+                strip.append((digest, src, dst))
+
+        results.update(pool.map(strip_texture, strip))
+
+        for shape, group in groups.items():
+            batch_len = 1
+            if shape is not None:
+                batch_len = max(1, Constants.TEXTURE_BATCH_PIXELS // (shape[0] * shape[1]))
+
+            for i in range(0, len(group), batch_len):
+                results.update(process_batch(pool, group[i:i+batch_len], size))
+
+    saved = sum([os.path.getsize(unique[digest]) - os.path.getsize(dst) for digest, dst in results.items()])
+    print(f"Processed {len(unique)} textures ({len(todo)} new, {len(unique) - len(todo)} cached), saved {saved} bytes")
+
+    trim_cache(cache_dir, set(results.values()) | {index_path})
+    write_index(index_path, index)
+
+    return [results[digests[t]] for t in textures]
+
+# load the index of hashed source files (path -> [size, mtime_ns, hash])
+# a missing or broken index is treated as empty
+def read_index(path: str) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+
+    except (OSError, ValueError):
+        return {}
+
+    if not type(index) == dict:
+        return {}
+
+    return index
+
+# save the index, keeping only sources whose results are still cached
+def write_index(path: str, index: dict):
+    cache_dir = os.path.dirname(path)
+    cached = set([f.split('_')[0] for f in os.listdir(cache_dir) if f.endswith('.png')])
+
+    index = {src: entry for src, entry in index.items() if type(entry) == list and len(entry) == 3 and entry[2] in cached}
+
+    try:
+        write_cached(path, json.dumps(index, sort_keys=True).encode('utf-8'))
+
+    except OSError:
+        pass
+
+# textures are decoded if they have to be downscaled, or if they're
+#   small enough to re-encode quickly
+def needs_decode(shape, size: int) -> bool:
+    if np is None:
+        return False
+
+    if shape is None:
+        return True
+
+    if size > 0 and max(shape) > size:
+        return True
+
+    return shape[0] * shape[1] <= Constants.TEXTURE_REENCODE_PIXELS
+
+# write a processed texture into the cache under a unique temporary
+#   name first, so a half-written file is never mistaken for a
+#   finished cache entry
+def write_cached(dst: str, data: bytes):
+    fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(dst))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, dst)
+
+# strip a texture's ancillary chunks without decoding it
+# item is a (digest, source path, cache path) tuple
+# returns (digest, processed path)
+def strip_texture(item):
+    digest, src, dst = item
+
+    try:
+        with open(src, 'rb') as f:
+            data = strip_png(f.read())
+
+    except (ValueError, struct.error, OSError):
+        print(f"Warning: Couldn't process texture {src}. It will be copied as-is.")
+        return digest, src
+
+    write_cached(dst, data)
+    return digest, dst
+
+# delete the least recently used cache entries until the cache fits
+#   in its size limit. Entries in keep are in use and never deleted
+def trim_cache(cache_dir: str, keep: set):
+    entries = []
+    total = 0
+
+    for f in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, f)
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+
+        total += st.st_size
+        if path not in keep:
+            entries.append((st.st_atime, st.st_size, path))
+
+    for atime, fsize, path in sorted(entries):
+        if total <= Constants.TEXTURE_CACHE_BYTES:
+            break
+
+        try:
+            os.remove(path)
+            total -= fsize
+        except OSError:
+            pass
+
+# decode, resize and encode one batch of same-sized textures
+# batch is a list of (digest, source path, cache path) tuples
+# returns a dict of digest -> processed path
+def process_batch(pool: ThreadPoolExecutor, batch: list, size: int) -> dict:
+    results = {}
+
+    def decode(item):
+        digest, src, dst = item
+
+        try:
+            with open(src, 'rb') as f:
+                data = f.read()
+
+            return (strip_png(data), decode_png(data))
+
+        except (ValueError, zlib.error, struct.error, IndexError, OSError):
+            print(f"Warning: Couldn't process texture {src}. It will be copied as-is.")
+            return None
+
+    images = list(pool.map(decode, batch))
+
+    decoded = []
+    for item, image in zip(batch, images):
+        if image is None:
+            results[item[0]] = item[1]
+        else:
+            decoded.append((item, image[0], image[1]))
+
+    if len(decoded) == 0:
+        return results
+
+    #only shrink textures, never enlarge them
+    height, width, _ = decoded[0][2].shape
+    if size > 0 and max(height, width) > size:
+        resized = resize_batch(np.stack([img for item, stripped, img in decoded]), size)
+
+        #the stripped original is no use once the image is resized
+        decoded = [(item, None, img) for (item, stripped, old), img in zip(decoded, resized)]
+
+    def encode(entry):
+        (digest, src, dst), stripped, img = entry
+        data = encode_png(img)
+
+        #the original can already be smaller than anything the
+        #  encoder here makes
+        if stripped is not None and len(stripped) <= len(data):
+            data = stripped
+
+        write_cached(dst, data)
+        return digest, dst
+
+    results.update(pool.map(encode, decoded))
+
+    return results
@@ -4,17 +4,17 @@
 #Generation tool, datapack design, and resourcepack design by link2_thepast
 #
 #Generates datapack v2.0
-from typing import Union, TextIO
-
 import os
-import json
-import shutil
-import zipfile
+import math
+import functools
 
 import src.contents.datapack.factory as dp_contents_factory
+import src.generator.writer as pack_writer
 
 from src.definitions import Constants, Status, IMDException, DiscListContents, DisplayStrings
 from src.generator.base import VirtualGenerator
+from src.generator.writer import VirtualPackWriter, hash_file
+from src.generator.template import CompiledTemplate, compile_json
 
 
 
@@ -24,54 +24,70 @@ class GeneratorV2(VirtualGenerator):
 
         #read settings
         pack_format = user_settings.get('version').get('dp', Constants.DEFAULT_PACK_FORMAT)
-        offset = user_settings.get('offset', 0)
-
-        for i,entry in enumerate(entry_list.entries):
-            entry.custom_model_data = i + offset + 1
 
         datapack_name = user_settings.get('name', Constants.DEFAULT_PACK_NAME)
         datapack_name = datapack_name + Constants.DATAPACK_SUFFIX
 
-        #read datapack contents
-        dp = dp_contents_factory.get(pack_format)
+        dispatch_tree = user_settings.get('dispatch_tree', False)
+        creeper_buckets = user_settings.get('creeper_buckets', False)
+
+        #read compiled datapack contents
+        dp, dp_templates, creeper_entry_template = get_compiled_contents(pack_format, get_datapack_options(user_settings))
 
-        #following variables are not explicitly used, but are included in locals()
-        #  which gets used to format template strings from contents.datapack
-        dp_version_str = dp.version_str
-        dp_num_discs = len(entry_list.entries)
-        mix_mono_title = DisplayStrings.STR_MIXMONO_TITLE
+        #per-pack values used to fill in template strings from contents.datapack
+        fmt_dict = {
+            'datapack_name': datapack_name,
+            'dp_version_str': dp.version_str,
+            'dp_num_discs': len(entry_list.entries),
+            'mix_mono_title': DisplayStrings.STR_MIXMONO_TITLE,
+            'poll_interval': user_settings.get('poll_interval', 0),
+            'poll_step': max(1, user_settings.get('poll_interval', 0) // Constants.POLL_BUCKETS),
+            'poll_recent_ticks': Constants.POLL_RECENT_TICKS,
+            'poll_recent_interval': Constants.POLL_RECENT_INTERVAL
+        }
 
         #write datapack
+        #pack writer streams files into a folder or straight into a .zip
         try:
-            self.delete_pack(datapack_name)
-            os.makedirs(datapack_name)
-
-            with self.set_directory(datapack_name):
+            with pack_writer.get(datapack_name, user_settings) as pack:
                 #write 'pack.mcmeta'
                 #reach into dict and set pack_format manually, since there's no str.format()
                 #  equivalent for integers
-                self.write_single(dp.get_pack_mcmeta(pack_format), locals())
+                self.write_single(pack, CompiledTemplate.compile(dp.get_pack_mcmeta(pack_format)).bind(fmt_dict, pack.pretty))
 
                 #write 'creeper.json'
                 #generate JSON for music disc entries, then reach into dict and add them
                 #  to the drop pool manually
+                creeper_entry_template = creeper_entry_template.bind(fmt_dict)
+
                 creeper_music_entries = []
                 creeper_music_entries.append(dp.get_creeper_music_entry_base())
 
-                for entry in entry_list.entries:
-                    creeper_music_entries.append(self.fmt_json(dp.get_creeper_music_entry_custom(), locals()))
+                if creeper_buckets:
+                    self.write_creeper_buckets(pack, dp, creeper_entry_template, creeper_music_entries, entry_list, fmt_dict)
+                else:
+                    for entry in entry_list.entries:
+                        creeper_music_entries.append(creeper_entry_template.render(entry))
 
                 creeper_json = dp.get_creeper_json(creeper_music_entries)
-                self.write_single(creeper_json, locals())
+                self.write_single(pack, CompiledTemplate.compile(creeper_json).bind(fmt_dict, pack.pretty))
 
                 #write other datapack files
-                for dp_file in dp.contents:
-                    if dp_file['repeat'] == 'single':
-                        self.write_single(dp_file, locals())
-                    elif dp_file['repeat'] == 'copy':
-                        self.write_copy(dp_file, entry_list, locals())
-                    elif dp_file['repeat'] == 'copy_within':
-                        self.write_copy_within(dp_file, entry_list, locals())
+                for dp_file in dp_templates:
+                    dp_file = dp_file.bind(fmt_dict, pack.pretty)
+
+                    if dp_file.repeat == 'single':
+                        self.write_single(pack, dp_file)
+                    elif dp_file.repeat == 'copy':
+                        self.write_copy(pack, dp_file, entry_list)
+                    elif dp_file.repeat == 'copy_within':
+                        if dispatch_tree and dp_file.dispatch is not None:
+                            self.write_dispatch_tree(pack, dp_file, entry_list)
+                        else:
+                            self.write_copy_within(pack, dp_file, entry_list)
+
+                #copy pack.png
+                self.copy_pack_png(pack, user_settings)
 
         except UnicodeEncodeError:
             raise IMDException(Status.BAD_UNICODE_CHAR)
@@ -79,39 +95,27 @@ class GeneratorV2(VirtualGenerator):
         except FileExistsError:
             raise IMDException(Status.PACK_DIR_IN_USE)
 
-        #copy pack.png
-        self.copy_pack_png(datapack_name, user_settings)
-
-        #move pack to .zip, if selected
-        use_zip = user_settings.get('zip', False)
-
-        if use_zip:
-            self.zip_pack(datapack_name)
-
 
 
     def generate_resourcepack(self, entry_list: DiscListContents, user_settings={}):
 
         #read settings
         pack_format = user_settings.get('version').get('rp', Constants.DEFAULT_PACK_FORMAT)
-        offset = user_settings.get('offset', 0)
-
-        for i,entry in enumerate(entry_list.entries):
-            entry.custom_model_data = i + offset + 1
 
         resourcepack_name = user_settings.get('name', Constants.DEFAULT_PACK_NAME)
         resourcepack_name = resourcepack_name + Constants.RESOURCEPACK_SUFFIX
 
         #write resourcepack
         try:
-            self.delete_pack(resourcepack_name)
-            os.makedirs(resourcepack_name)
+            texture_names = self.get_texture_names(entry_list)
+
+            with pack_writer.get(resourcepack_name, user_settings) as pack:
+                self.write_rp_framework(pack, entry_list, pack_format)
+                self.write_item_models(pack, entry_list, texture_names)
+                self.copy_assets(pack, entry_list, texture_names)
 
-            #write resourcepack files to pack directory
-            with self.set_directory(resourcepack_name):
-                self.write_rp_framework(entry_list, pack_format)
-                self.write_item_models(entry_list)
-                self.copy_assets(entry_list)
+                #copy pack.png
+                self.copy_pack_png(pack, user_settings)
 
         except UnicodeEncodeError:
             raise IMDException(Status.BAD_UNICODE_CHAR)
@@ -119,268 +123,244 @@ class GeneratorV2(VirtualGenerator):
         except FileExistsError:
             raise IMDException(Status.PACK_DIR_IN_USE)
 
-        #copy pack.png
-        self.copy_pack_png(resourcepack_name, user_settings)
-
-        #move pack to .zip, if selected
-        use_zip = user_settings.get('zip', False)
-
-        if use_zip:
-            self.zip_pack(resourcepack_name)
-
-    # generate directory structure and framework files
-    def write_rp_framework(self, entry_list: DiscListContents, pack_format: int):
-
-        #build resourcepack directory tree
-        os.makedirs(os.path.join('assets', 'minecraft', 'atlases'))
-        os.makedirs(os.path.join('assets', 'minecraft', 'models', 'item'))
-        os.makedirs(os.path.join('assets', 'minecraft', 'sounds', 'records'))
-        os.makedirs(os.path.join('assets', 'minecraft', 'textures', 'item'))
+    # generate framework files
+    def write_rp_framework(self, pack: VirtualPackWriter, entry_list: DiscListContents, pack_format: int):
 
         #write 'pack.mcmeta'
-        with open(os.path.join('pack.mcmeta'), 'w', encoding='utf-8') as pack:
-            pack_mcmeta_json = {
-                'pack':{
-                    'pack_format':pack_format,
-                    'description':(Constants.RESOURCEPACK_DESC % len(entry_list.internal_names))
-                }
+        pack_mcmeta_json = {
+            'pack':{
+                'pack_format':pack_format,
+                'description':(Constants.RESOURCEPACK_DESC % len(entry_list.internal_names))
             }
+        }
 
-            json.dump(pack_mcmeta_json, pack, indent=4)
+        pack.write_json('pack.mcmeta', pack_mcmeta_json)
 
         #write 'sounds.json'
-        with self.set_directory(os.path.join('assets', 'minecraft')):
-            with open('sounds.json', 'w', encoding='utf-8') as sounds:
-                sounds_json = {}
-
-                for name in entry_list.internal_names:
-                    sound = {
-                        'sounds':[{
-                            'name':f'records/{name}',
-                            'stream':True
-                        }]
-                    }
+        sounds_json = {}
+
+        for name in entry_list.internal_names:
+            sound = {
+                'sounds':[{
+                    'name':f'records/{name}',
+                    'stream':True
+                }]
+            }
 
-                    sounds_json[f'music_disc.{name}'] = sound
+            sounds_json[f'music_disc.{name}'] = sound
 
-                json.dump(sounds_json, sounds, indent=4)
+        pack.write_json(os.path.join('assets', 'minecraft', 'sounds.json'), sounds_json)
 
         #write items atlas
-        with self.set_directory(os.path.join('assets', 'minecraft', 'atlases')):
-            with open('blocks.json', 'w', encoding='utf-8') as blocks:
-                atlas_json = {
-                    "sources": [
-                        {
-                            "type": "directory",
-                            "source": "item",
-                            "prefix": "item/"
-                        }
-                    ]
+        atlas_json = {
+            "sources": [
+                {
+                    "type": "directory",
+                    "source": "item",
+                    "prefix": "item/"
                 }
+            ]
+        }
 
-                json.dump(atlas_json, blocks, indent=4)
-
-    # generate item models
-    def write_item_models(self, entry_list: DiscListContents):
-
-        with self.set_directory(os.path.join('assets', 'minecraft', 'models', 'item')):
+        pack.write_json(os.path.join('assets', 'minecraft', 'atlases', 'blocks.json'), atlas_json)
 
-            #write 'music_disc_11.json'
-            with open('music_disc_11.json', 'w', encoding='utf-8') as music_disc_11:
+    # many discs share the same label art, so group discs by the hash
+    #   of their texture. Each unique image is stored once, along with
+    #   one item model, under the name of the first disc that uses it
+    # returns a dict of internal name -> name of the shared texture
+    def get_texture_names(self, entry_list: DiscListContents) -> dict:
+        texture_names = {}
+        names_by_hash = {}
+        saved_files = 0
+        saved_bytes = 0
 
-                override_list = []
-                for entry in entry_list.entries:
+        for entry in entry_list.entries:
+            digest = hash_file(entry.texture_file)
 
-                    override_list.append({
-                        'predicate': {'custom_model_data': entry.custom_model_data},
-                        'model': f'item/music_disc_{entry.internal_name}'
-                    })
+            if digest in names_by_hash:
+                saved_files += 1
+                saved_bytes += os.path.getsize(entry.texture_file)
+            else:
+                names_by_hash[digest] = entry.internal_name
 
-                music_disc_11_json = {
-                    'parent': 'item/generated',
-                    'textures': {'layer0': 'item/music_disc_11'},
-                    'overrides': override_list
-                }
+            texture_names[entry.internal_name] = names_by_hash[digest]
 
-                json.dump(music_disc_11_json, music_disc_11, indent=4)
+        if saved_files > 0:
+            print(f"{len(entry_list.entries)} discs share {len(names_by_hash)} unique textures, saved {saved_files} textures and models ({saved_bytes} bytes)")
 
-            #write 'music_disc_*.json' files
-            for name in entry_list.internal_names:
-                with open(f'music_disc_{name}.json', 'w', encoding='utf-8') as music_disc:
+        return texture_names
 
-                    music_disc_json = {
-                        'parent':'item/generated',
-                        'textures':{'layer0': f'item/music_disc_{name}'}
-                    }
+    # generate item models
+    def write_item_models(self, pack: VirtualPackWriter, entry_list: DiscListContents, texture_names: dict):
+        models_dir = os.path.join('assets', 'minecraft', 'models', 'item')
+
+        #write 'music_disc_11.json'
+        #the game uses the last override whose custom_model_data is at or
+        #  below the item's, so overrides have to be in ascending order
+        override_list = []
+        for entry in sorted(entry_list.entries, key=lambda e: e.custom_model_data):
+
+            override_list.append({
+                'predicate': {'custom_model_data': entry.custom_model_data},
+                'model': f'item/music_disc_{texture_names[entry.internal_name]}'
+            })
+
+        music_disc_11_json = {
+            'parent': 'item/generated',
+            'textures': {'layer0': 'item/music_disc_11'},
+            'overrides': override_list
+        }
+
+        pack.write_json(os.path.join(models_dir, 'music_disc_11.json'), music_disc_11_json)
+
+        #write 'music_disc_*.json' files, one per unique texture
+        for name in entry_list.internal_names:
+            if not texture_names[name] == name:
+                continue
+
+            music_disc_json = {
+                'parent':'item/generated',
+                'textures':{'layer0': f'item/music_disc_{name}'}
+            }
 
-                    json.dump(music_disc_json, music_disc, indent=4)
+            pack.write_json(os.path.join(models_dir, f'music_disc_{name}.json'), music_disc_json)
 
     # generate assets dir
-    def copy_assets(self, entry_list: DiscListContents):
-
-        #copy sound and texture files
+    def copy_assets(self, pack: VirtualPackWriter, entry_list: DiscListContents, texture_names: dict):
+        records_dir = os.path.join('assets', 'minecraft', 'sounds', 'records')
+        textures_dir = os.path.join('assets', 'minecraft', 'textures', 'item')
+
+        #move converted tracks out of scratch space instead of copying
+        #  them, since they're deleted right after anyway
+        #textures belong to the user, so they're always left in place
+        assets = []
         for entry in entry_list.entries:
-            with self.set_directory(os.path.join('assets', 'minecraft', 'sounds', 'records')):
-                shutil.copyfile(entry.track_file, f'{entry.internal_name}.ogg')
+            assets.append((os.path.join(records_dir, f'{entry.internal_name}.ogg'), entry.track_file, self.scratch.owns(entry.track_file)))
+
+            #only the first disc using a texture stores it
+            if texture_names[entry.internal_name] == entry.internal_name:
+                assets.append((os.path.join(textures_dir, f'music_disc_{entry.internal_name}.png'), entry.texture_file, False))
 
-            with self.set_directory(os.path.join('assets', 'minecraft', 'textures', 'item')):
-                shutil.copyfile(entry.texture_file, f'music_disc_{entry.internal_name}.png')
+        pack.copy_files(assets)
 
 
 
-    def copy_pack_png(self, pack_name: str, user_settings: dict):
+    def copy_pack_png(self, pack: VirtualPackWriter, user_settings: dict):
         try:
             if 'pack' in user_settings:
-                shutil.copyfile(user_settings['pack'], os.path.join(pack_name, 'pack.png'))
+                pack.copy_file('pack.png', user_settings['pack'])
             else:
                 raise FileNotFoundError
 
         except (FileNotFoundError, IOError):
             print("Warning: No pack.png found. Your datapack/resourcepack will not have an icon.")
 
-    def delete_pack(self, pack_name):
-        #try to remove old pack. If pack folder exists but mcmeta does not,
-        #  then this directory may belong to something else so don't delete
-        if os.path.isdir(pack_name):
-            if not os.path.isfile(os.path.join(pack_name, 'pack.mcmeta')):
-                raise FileExistsError
-            else:
-                shutil.rmtree(pack_name, ignore_errors=True)
+    # write a single copy of a file based on a compiled
+    #  template from contents.datapack
+    def write_single(self, pack: VirtualPackWriter, src: CompiledTemplate):
+        pack.write_text(src.render_path(None), src.render_contents(None))
 
-    def zip_pack(self, pack_name: str):
-        pack_name_zip = pack_name + Constants.ZIP_SUFFIX
+    # write several copies of a file, one copy per
+    #   entry in entry_list. Every copy is rendered
+    #   first, then written as one batch
+    def write_copy(self, pack: VirtualPackWriter, src: CompiledTemplate, entry_list: DiscListContents):
+        files = [(src.render_path(entry), src.render_contents(entry)) for entry in entry_list.entries]
+        pack.write_texts(files)
 
-        try:
-            #remove old zip
-            if os.path.exists(pack_name_zip):
-                os.remove(pack_name_zip)
+    # write the same lines into a file multiple times,
+    #   once per entry in entry_list
+    def write_copy_within(self, pack: VirtualPackWriter, src: CompiledTemplate, entry_list: DiscListContents):
+        lines = [src.render_contents(entry) for entry in entry_list.entries]
+        pack.write_text(src.render_path(None), ''.join(lines))
 
-            #generate new zip archive
-            with zipfile.ZipFile(pack_name_zip, 'w') as rp_zip:
-                for root, dirs, files in os.walk(pack_name):
-                    root_zip = os.path.relpath(root, pack_name)
+    # split the music disc entries of 'creeper.json' into about sqrt(N)
+    #   buckets of discs with neighboring custom_model_data, and write
+    #   each bucket to its own loot table
+    # adds one entry per bucket to creeper_music_entries, weighted by
+    #   the number of discs in it, so drop chances stay the same
+    def write_creeper_buckets(self, pack: VirtualPackWriter, dp, entry_template, creeper_music_entries: list, entry_list: DiscListContents, fmt_dict: dict):
+        entries = sorted(entry_list.entries, key=lambda e: e.custom_model_data)
 
-                    for file in files:
-                        rp_zip.write(os.path.join(root, file), os.path.join(root_zip, file))
+        if len(entries) == 0:
+            return
 
-            #remove pack folder
-            if os.path.exists(pack_name_zip):
-                shutil.rmtree(pack_name, ignore_errors=True)
+        bucket_size = math.isqrt(len(entries) - 1) + 1
 
-        except (OSError, zipfile.BadZipFile):
-            #remove bad zip, if it exists
-            if os.path.exists(pack_name_zip):
-                os.remove(pack_name_zip)
+        for i, start in enumerate(range(0, len(entries), bucket_size)):
+            bucket = [entry_template.render(entry) for entry in entries[start:start + bucket_size]]
 
-            # raise exception to alert user
-            raise IMDException(Status.BAD_ZIP)
+            bucket_json = dp.get_creeper_bucket_json(i, bucket)
+            self.write_single(pack, CompiledTemplate.compile(bucket_json).bind(fmt_dict, pack.pretty))
 
-    # apply string formatting to the given string
-    # use ** to expand fmt_dict into kwargs for formatting
-    def fmt_str(self, str: str, fmt_dict):
-        return str.format(**fmt_dict)
+            creeper_music_entries.append(dp.get_creeper_bucket_entry(fmt_dict['datapack_name'], i, len(bucket)))
 
-    # recursively apply string formatting to any string-type
-    #   value in the given json dict or json sub-list
-    def fmt_json(self, obj: Union[dict, list], fmt_dict):
+    # write a copy_within file as a balanced binary search over the
+    #   entries' custom_model_data instead of one line per entry
+    # every function in the tree checks which half of its range the
+    #   score falls in and calls the function for that half, so finding
+    #   a disc runs O(log N) commands instead of O(N). Ranges with only
+    #   one disc left use the template's line for that disc directly
+    def write_dispatch_tree(self, pack: VirtualPackWriter, src: CompiledTemplate, entry_list: DiscListContents):
+        entries = sorted(entry_list.entries, key=lambda e: e.custom_model_data)
 
-        #change iterator depending on type, so that the iterated
-        #  object's contents can always be accessed by obj[k]
-        #dict: obj[key of element]
-        #list: obj[index of element]
-        if type(obj) == list:
-            iterator = [i for i in range(len(obj))]
-            fmt_obj = list(obj)
-        else:
-            iterator = [k for k in obj]
-            fmt_obj = dict(obj)
+        root_path = src.render_path(None)
+        tree_dir = os.path.splitext(root_path)[0] + Constants.DISPATCH_TREE_SUFFIX
+        tree_function = get_function_id(tree_dir)
 
-        for k in iterator:
+        score = src.dispatch['score'].render(None)
+        files = []
 
-            if type(obj[k]) == str:
-                fmt_obj[k] = self.fmt_str(obj[k], fmt_dict)
+        def write_node(path: str, node_entries: list, lines: list):
+            mid = (len(node_entries) + 1) // 2
 
-            elif type(obj[k]) in [dict, list]:
-                fmt_obj[k] = self.fmt_json(obj[k], fmt_dict)
+            for half in [node_entries[:mid], node_entries[mid:]]:
+                if len(half) == 0:
+                    continue
 
-        return fmt_obj
+                if len(half) == 1:
+                    lines.append(src.render_contents(half[0]))
+                    continue
 
-    # apply string formatting to each element of the given
-    #   list and combine them into a single path string.
-    # use * to splat fmt_path into multiple strings
-    #   for os.path.join
-    def fmt_path(self, path: list, fmt_dict) -> str:
-        fmt_path = [self.fmt_str(p, fmt_dict) for p in path]
-        return os.path.join(*fmt_path)
+                lo = half[0].custom_model_data
+                hi = half[-1].custom_model_data
 
+                lines.append(f'execute if score {score} matches {lo}..{hi} run function {tree_function}/{lo}_{hi}\n')
+                write_node(os.path.join(tree_dir, f'{lo}_{hi}.mcfunction'), half, [])
 
+            files.append((path, ''.join(lines)))
 
-    # write a single copy of a file based on a reference
-    #  object from contents.datapack
-    def write_single(self, src: dict, fmt_dict):
-        fmt_dict.update(locals())
-        f_dst = self.fmt_path(src['path'], fmt_dict)
-        d_dst = os.path.dirname(f_dst)
+        root_lines = []
+        if 'setup' in src.dispatch:
+            root_lines.append(src.dispatch['setup'].render(None) + '\n')
 
-        if not d_dst == '' and not os.path.exists(d_dst):
-            os.makedirs(d_dst)
+        write_node(root_path, entries, root_lines)
+        pack.write_texts(files)
 
-        with open(f_dst, 'w', encoding='utf-8') as dst:
-            self.write_pack_file(src, dst, fmt_dict)
 
-    # write several copies of a file, one copy per
-    #   entry in entry_list
-    def write_copy(self, src: dict, entry_list: DiscListContents, fmt_dict):
-        for entry in entry_list.entries:
-            fmt_dict.update(locals())
-            f_dst = self.fmt_path(src['path'], fmt_dict)
-            d_dst = os.path.dirname(f_dst)
 
-            if not os.path.exists(d_dst):
-                os.makedirs(d_dst)
+# convert the path of a function inside a datapack
+#   ('data/<namespace>/functions/<name>') to its function ID
+def get_function_id(path: str) -> str:
+    parts = os.path.normpath(path).split(os.sep)
+    i = parts.index('functions')
 
-            with open(f_dst, 'w', encoding='utf-8') as dst:
-                self.write_pack_file(src, dst, fmt_dict)
+    return parts[i-1] + ':' + '/'.join(parts[i+1:])
 
-    # write the same lines into a file multiple times,
-    #   once per entry in entry_list
-    def write_copy_within(self, src: dict, entry_list: DiscListContents, fmt_dict):
-        f_dst = self.fmt_path(src['path'], fmt_dict)
-        d_dst = os.path.dirname(f_dst)
-
-        if not os.path.exists(d_dst):
-            os.makedirs(d_dst)
-
-        with open(f_dst, 'w', encoding='utf-8') as dst:
-            for entry in entry_list.entries:
-                fmt_dict.update(locals())
-
-                self.write_pack_file(src, dst, fmt_dict)
-
-    # given a reference dict, detect whether it will
-    #   write a plaintext or JSON file
-    def write_pack_file(self, src: dict, dst: TextIO, fmt_dict):
-        if type(src['contents']) == str:
-            self.write_text_file(src, dst, fmt_dict)
-
-        elif type(src['contents']) == dict:
-            self.write_json_file(src, dst, fmt_dict)
-
-    # write a plaintext file, optionally formatting
-    #   the given string
-    def write_text_file(self, src: dict, dst: TextIO, fmt_dict):
-        if src.get('format_contents', True):
-            dst.writelines(self.fmt_str(src['contents'].lstrip(), fmt_dict))
-        else:
-            dst.writelines(src['contents'].lstrip())
-
-    # write a JSON file, optionally applying recursive
-    #   string formatting to every string value in the
-    #   given dict
-    def write_json_file(self, src: dict, dst: TextIO, fmt_dict):
-        if src.get('format_contents', True):
-            json.dump(self.fmt_json(src['contents'], fmt_dict), dst, indent=4)
-        else:
-            json.dump(src['contents'], dst, indent=4)
 
+# settings that change which files go into the datapack. A setting
+#   is passed on to contents.datapack as an option if it's set
+DATAPACK_OPTIONS = ['macro_datapack', 'poll_interval', 'block_state_polling', 'gametime_timers', 'fast_raycast', 'score_listeners']
+
+def get_datapack_options(user_settings: dict) -> tuple:
+    return tuple([k for k in DATAPACK_OPTIONS if user_settings.get(k, False)])
+
+# compile the datapack templates for a pack_format and set of
+#   options once, and reuse them for every later generation
+@functools.lru_cache(maxsize=None)
+def get_compiled_contents(pack_format: int, options: tuple = ()):
+    dp = dp_contents_factory.get(pack_format, options)
+
+    dp_templates = [CompiledTemplate.compile(f) for f in dp.contents]
+    creeper_entry_template = compile_json(dp.get_creeper_music_entry_custom())
 
+    return (dp, dp_templates, creeper_entry_template)
@@ -0,0 +1,792 @@
+# -*- coding: utf-8 -*-
+#
+#Infinite Music Discs pack writer module
+#Generation tool, datapack design, and resourcepack design by link2_thepast
+
+import os
+import stat
+import uuid
+import zlib
+import json
+import time
+import hashlib
+import shutil
+import struct
+import tempfile
+import threading
+import collections
+
+from concurrent.futures import ThreadPoolExecutor
+
+from src.definitions import Constants, Status, IMDException
+from src.generator.fileops import place_file, share_file
+from src.generator.jsonenc import dumps
+
+
+
+# Virtual class for pack output targets. Generators write every pack
+#   file through a writer using paths relative to the pack root, so
+#   the same generator code can target a folder or a .zip archive
+# Writers are context managers: entering opens the target, exiting
+#   finalizes it, or cleans up after a failure
+class VirtualPackWriter():
+    def __init__(self, pack_name: str, pretty: bool = False):
+        self.pack_name = pack_name
+        self.pretty = pretty
+
+        #resolve the pack root once, so nothing depends on the
+        #  working directory while the pack is written
+        self.root = os.path.abspath(pack_name)
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            #finalizing can fail too, clean up after that the same way
+            try:
+                self.close()
+            except BaseException:
+                self.abort()
+                raise
+        else:
+            self.abort()
+
+        return False
+
+    def open(self):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def abort(self):
+        raise NotImplementedError
+
+    # write a string to a file in the pack
+    def write_text(self, path: str, text: str):
+        raise NotImplementedError
+
+    # write many small text files at once
+    # items is a list of (path, text) tuples
+    def write_texts(self, items: list):
+        for path, text in items:
+            self.write_text(path, text)
+
+    # write a JSON-serializable object to a file in the pack
+    def write_json(self, path: str, obj):
+        self.write_text(path, dumps(obj, self.pretty))
+
+    # add an existing file to the pack. If move is set, src is
+    #   an intermediate file that may be consumed in the process
+    def copy_file(self, path: str, src: str, move: bool = False):
+        raise NotImplementedError
+
+    # add many existing files to the pack
+    # items is a list of (path, src, move) tuples
+    def copy_files(self, items: list):
+        for path, src, move in items:
+            self.copy_file(path, src, move)
+
+    # if a folder with the pack's name exists but pack.mcmeta does
+    #   not, then this directory may belong to something else, so
+    #   it must not be replaced
+    def check_folder(self):
+        if os.path.isdir(self.root) and not os.path.isfile(os.path.join(self.root, 'pack.mcmeta')):
+            raise FileExistsError
+
+    # try to remove an old pack folder
+    def remove_folder(self):
+        self.check_folder()
+
+        if os.path.isdir(self.root):
+            remove_in_background(move_aside(self.root))
+
+        #the manifest kept next to an old pack folder goes with it
+        manifest = self.root + Constants.MANIFEST_SUFFIX
+        if os.path.isfile(manifest):
+            os.remove(manifest)
+
+    # staging and trash folders are only left next to the pack if
+    #   a previous generation crashed
+    def remove_leftovers(self):
+        parent, name = os.path.split(self.root)
+
+        for f in os.listdir(parent):
+            if f.startswith(name + Constants.STAGING_SUFFIX) or f.startswith(name + Constants.TRASH_SUFFIX):
+                path = os.path.join(parent, f)
+
+                if os.path.isdir(path):
+                    remove_in_background(path)
+                else:
+                    os.remove(path)
+
+    # a unique path next to the pack to build the new pack in
+    def staging_path(self, ext: str = '') -> str:
+        return self.root + Constants.STAGING_SUFFIX + uuid.uuid4().hex[:8] + ext
+
+
+
+# move a folder out of the way with a quick rename into a fresh trash
+#   folder next to it, and return the trash folder
+# raises OSError if the folder can't be renamed (folder in use). The
+#   folder is never deleted in place, so it's either moved whole or
+#   left alone
+def move_aside(path: str) -> str:
+    parent, name = os.path.split(path)
+
+    #rename into a fresh folder, since renaming a directory onto
+    #  an existing name doesn't work everywhere
+    trash = tempfile.mkdtemp(prefix=name + Constants.TRASH_SUFFIX, dir=parent)
+
+    try:
+        os.replace(path, os.path.join(trash, name))
+
+    except OSError:
+        os.rmdir(trash)
+        raise
+
+    return trash
+
+# delete a folder on a background thread so generation never waits on it
+def remove_in_background(path: str):
+    threading.Thread(target=shutil.rmtree, args=(path,), kwargs={'ignore_errors': True}).start()
+
+
+
+# Writes the pack as a plain folder
+# The pack is built in a staging folder next to the target and renamed
+#   into place once it's complete, so the old pack stays usable until
+#   then and a crash never leaves a half-written pack
+# Every written file is recorded in a manifest (path -> content hash)
+#   kept next to the pack, so it never ships inside it. If the previous
+#   generation left a manifest behind, files whose contents haven't
+#   changed are hardlinked from the old pack into the staging folder
+#   instead of being written again
+# The staging folder is only created once the first file changes. If
+#   nothing changes, the old pack is kept as it is
+# The size and modification time of every copied source file are
+#   recorded too, so unchanged sources aren't hashed again
+class FolderPackWriter(VirtualPackWriter):
+    def __init__(self, pack_name: str, pretty: bool = False):
+        super().__init__(pack_name, pretty)
+
+        self.old_manifest = {}
+        self.manifest = {}
+        self.num_skipped = 0
+        self.pool = None
+
+        #source file path -> [size, mtime_ns]
+        self.old_sources = {}
+        self.sources = {}
+
+        #staging folder files are written to
+        self.out_dir = self.root
+        self.staging = False
+
+        #unchanged files that still have to be linked into the staging
+        #  folder once it's created
+        self.pending = []
+
+        #throughput of batched small-file writes
+        self.num_batched = 0
+        self.batch_time = 0.0
+
+    def open(self):
+        self.remove_leftovers()
+
+        old_manifest = self.read_manifest()
+
+        if old_manifest is None:
+            self.check_folder()
+        else:
+            self.old_manifest, self.old_sources = old_manifest
+
+        self.out_dir = self.staging_path()
+
+        self.pool = ThreadPoolExecutor()
+
+    # create the staging folder and link in every unchanged file
+    #   found so far. Safe to call from several threads at once
+    def start_staging(self):
+        with self.lock:
+            if self.staging:
+                return
+
+            os.makedirs(self.out_dir)
+
+            for path in self.pending:
+                dst = os.path.join(self.out_dir, path)
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                share_file(os.path.join(self.root, path), dst)
+
+            self.pending = []
+            self.staging = True
+
+    def close(self):
+        self.pool.shutdown()
+
+        #files from the previous generation that weren't carried over
+        stale = [p for p in self.old_manifest if p not in self.manifest]
+
+        #removing a file changes the pack too
+        if len(stale) > 0:
+            self.start_staging()
+
+        if self.staging:
+            try:
+                self.swap()
+
+            except OSError:
+                raise IMDException(Status.PACK_DIR_IN_USE)
+
+        self.write_manifest(self.manifest, self.sources)
+
+        if len(self.old_manifest) > 0:
+            num_written = len(self.manifest) - self.num_skipped
+            print(f"Updated {self.pack_name}: {num_written} files written, {len(stale)} removed, {self.num_skipped} unchanged")
+
+        if self.num_batched > 0 and self.batch_time > 0:
+            rate = self.num_batched / self.batch_time
+            print(f"Wrote {self.num_batched} files to {self.pack_name} in {self.batch_time:.2f}s ({rate:.0f} files/s)")
+
+    def abort(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+        #the old pack was never touched, just drop the unfinished one
+        if self.staging:
+            remove_in_background(self.out_dir)
+
+    # swap the finished pack into place. The old pack is renamed aside
+    #   first, and renamed back if the new pack can't be moved in, so
+    #   a pack that's in use is left as it was
+    def swap(self):
+        self.check_folder()
+
+        trash = None
+        if os.path.isdir(self.root):
+            trash = move_aside(self.root)
+
+        #the old manifest goes away with the old pack, so a crash during
+        #  the swap forces a full rebuild next time
+        if os.path.isfile(self.manifest_path):
+            os.remove(self.manifest_path)
+
+        try:
+            os.replace(self.out_dir, self.root)
+
+        except OSError:
+            if trash is not None:
+                os.replace(os.path.join(trash, os.path.basename(self.root)), self.root)
+                os.rmdir(trash)
+
+                if len(self.old_manifest) > 0:
+                    self.write_manifest(self.old_manifest, self.old_sources)
+
+            raise
+
+        self.staging = False
+
+        if trash is not None:
+            remove_in_background(trash)
+
+    def write_manifest(self, manifest: dict, sources: dict):
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({'files': manifest, 'sources': sources}, f, sort_keys=True)
+
+    @property
+    def manifest_path(self) -> str:
+        return self.root + Constants.MANIFEST_SUFFIX
+
+    # load the manifest of the previous generation, if there is
+    #   a valid one
+    # returns (path -> content hash, path -> source stats)
+    def read_manifest(self):
+        if not os.path.isfile(os.path.join(self.root, 'pack.mcmeta')):
+            return None
+
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+
+        except (OSError, ValueError):
+            return None
+
+        if not type(manifest) == dict:
+            return None
+
+        files = manifest.get('files')
+        sources = manifest.get('sources')
+
+        if not (type(files) == dict and type(sources) == dict):
+            return None
+
+        return files, sources
+
+    # record a file in the new manifest. If the copy in the old pack
+    #   is still current, carry it over to the new pack and return True
+    def is_current(self, path: str, digest: str) -> bool:
+        key = manifest_key(path)
+        old = os.path.join(self.root, path)
+        is_current = self.old_manifest.get(key) == digest and os.path.isfile(old)
+
+        with self.lock:
+            self.manifest[key] = digest
+
+            if is_current:
+                self.num_skipped += 1
+
+                #nothing to link into yet
+                if not self.staging:
+                    self.pending.append(path)
+                    return True
+
+        if is_current:
+            share_file(old, self.dst_path(path))
+
+        return is_current
+
+    # find where to write a file in the staging folder, creating the
+    #   staging folder first if needed
+    #safe to call from several threads at once
+    def dst_path(self, path: str) -> str:
+        if not self.staging:
+            self.start_staging()
+
+        dst = os.path.join(self.out_dir, path)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+
+        return dst
+
+    def write_text(self, path: str, text: str):
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+        if self.is_current(path, digest):
+            return
+
+        with open(self.dst_path(path), 'w', encoding='utf-8') as dst:
+            dst.write(text)
+
+    # write a batch of small files. Contents are hashed on this thread,
+    #   every directory the batch needs is created once, and then only
+    #   the file writes themselves fan out across the thread pool
+    def write_texts(self, items: list):
+        start = time.perf_counter()
+
+        changed = []
+        for path, text in items:
+            digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+            if not self.is_current(path, digest):
+                changed.append((path, text))
+
+        if len(changed) > 0:
+            self.start_staging()
+
+        for d in set([os.path.dirname(path) for path, text in changed]):
+            os.makedirs(os.path.join(self.out_dir, d), exist_ok=True)
+
+        jobs = [self.pool.submit(self.write_file, path, text) for path, text in changed]
+
+        for j in jobs:
+            j.result()
+
+        self.num_batched += len(changed)
+        self.batch_time += time.perf_counter() - start
+
+    # write a file whose directory already exists
+    def write_file(self, path: str, text: str):
+        with open(os.path.join(self.out_dir, path), 'w', encoding='utf-8') as dst:
+            dst.write(text)
+
+    def copy_file(self, path: str, src: str, move: bool = False):
+        key = manifest_key(path)
+
+        st = os.stat(src)
+        stats = [st.st_size, st.st_mtime_ns]
+
+        #a source that looks the same as last time still has the same
+        #  contents, so skip hashing it
+        if self.old_sources.get(key) == stats and key in self.old_manifest:
+            digest = self.old_manifest[key]
+        else:
+            digest = hash_file(src)
+
+        with self.lock:
+            self.sources[key] = stats
+
+        if self.is_current(path, digest):
+            #still release the intermediate file
+            if move:
+                os.remove(src)
+            return
+
+        place_file(src, self.dst_path(path), move=move)
+
+    # large asset copies are I/O bound, so fan them out
+    #   across the writer's thread pool
+    def copy_files(self, items: list):
+        jobs = [self.pool.submit(self.copy_file, path, src, move) for path, src, move in items]
+
+        for j in jobs:
+            j.result()
+
+
+
+# manifests always use forward slashes, so they don't depend on the OS
+def manifest_key(path: str) -> str:
+    return '/'.join(path.split(os.sep))
+
+# hash the contents of a file without reading it into memory all at once
+def hash_file(path: str) -> str:
+    h = hashlib.sha1()
+
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(Constants.HASH_BLOCK_SIZE), b''):
+            h.update(block)
+
+    return h.hexdigest()
+
+
+
+#zip compression methods
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+#past these, sizes, offsets and counts need zip64 records. The
+#  regular fields are then set to all ones
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_COUNT_LIMIT = 0xFFFF
+
+# compress data with raw deflate, the way zip archives store it,
+#   and return (method, compressed data, CRC-32, uncompressed size)
+# src is either the data itself or the path of a file to read it from
+# runs in worker threads; zlib releases the GIL while compressing
+def deflate_member(src, level: int):
+    if isinstance(src, str):
+        with open(src, 'rb') as f:
+            src = f.read()
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    compressed = compressor.compress(src) + compressor.flush()
+    crc = zlib.crc32(src)
+
+    #tiny files can grow when deflated, store those instead
+    if len(compressed) >= len(src):
+        return (ZIP_STORED, src, crc, len(src))
+
+    return (ZIP_DEFLATED, compressed, crc, len(src))
+
+# Writes the structure of a .zip archive around member data that was
+#   compressed ahead of time. zipfile can only add members by
+#   compressing them itself, one at a time under its own lock, so
+#   compression couldn't run in parallel through it
+# Everything that would depend on the machine or the time of generation
+#   (timestamp, permissions, host OS) is fixed, so the same members
+#   always give the same archive bytes
+class ZipArchive():
+    def __init__(self, path: str):
+        self.f = open(path, 'wb')
+        self.entries = []
+
+        year, month, day, hour, minute, second = Constants.ZIP_DATE_TIME
+        self.dos_date = (year - 1980) << 9 | month << 5 | day
+        self.dos_time = hour << 11 | minute << 5 | second // 2
+
+    # add a member whose data is already compressed with method
+    def add_bytes(self, arcname: str, method: int, data: bytes, crc: int, file_size: int):
+        offset = self.write_header(arcname, method, crc, len(data), file_size)
+        self.f.write(data)
+
+        self.entries.append((arcname, method, crc, len(data), file_size, offset))
+
+    # add a file from disk without compressing it. It's streamed in
+    #   blocks, and the header is filled in once the CRC is known
+    def add_file(self, arcname: str, src: str):
+        file_size = os.path.getsize(src)
+        offset = self.write_header(arcname, ZIP_STORED, 0, file_size, file_size)
+
+        crc = 0
+        with open(src, 'rb') as f_src:
+            for block in iter(lambda: f_src.read(Constants.HASH_BLOCK_SIZE), b''):
+                crc = zlib.crc32(block, crc)
+                self.f.write(block)
+
+        end = self.f.tell()
+        self.f.seek(offset + 14)
+        self.f.write(struct.pack('<L', crc))
+        self.f.seek(end)
+
+        self.entries.append((arcname, ZIP_STORED, crc, file_size, file_size, offset))
+
+    # write a member's local header and return its offset
+    def write_header(self, arcname: str, method: int, crc: int, compress_size: int, file_size: int) -> int:
+        offset = self.f.tell()
+        name, flags = self.encode_name(arcname)
+
+        extra = b''
+        version = 20
+        if file_size > ZIP64_LIMIT or compress_size > ZIP64_LIMIT:
+            extra = struct.pack('<HHQQ', 1, 16, file_size, compress_size)
+            version = 45
+            compress_size = file_size = 0xFFFFFFFF
+
+        self.f.write(struct.pack('<LHHHHHLLLHH', 0x04034b50, version, flags, method, self.dos_time, self.dos_date,
+                                 crc, compress_size, file_size, len(name), len(extra)))
+        self.f.write(name)
+        self.f.write(extra)
+
+        return offset
+
+    #names that aren't ASCII are stored as UTF-8, and flagged as such
+    def encode_name(self, arcname: str):
+        try:
+            return arcname.encode('ascii'), 0
+        except UnicodeEncodeError:
+            return arcname.encode('utf-8'), 0x800
+
+    # write the central directory
+    def close(self):
+        start = self.f.tell()
+        external_attr = (stat.S_IFREG | Constants.ZIP_FILE_MODE) << 16
+
+        for arcname, method, crc, compress_size, file_size, offset in self.entries:
+            name, flags = self.encode_name(arcname)
+
+            #zip64 fields are only added for the values that overflow
+            zip64 = []
+            if file_size > ZIP64_LIMIT:
+                zip64.append(file_size)
+                file_size = 0xFFFFFFFF
+            if compress_size > ZIP64_LIMIT:
+                zip64.append(compress_size)
+                compress_size = 0xFFFFFFFF
+            if offset > ZIP64_LIMIT:
+                zip64.append(offset)
+                offset = 0xFFFFFFFF
+
+            extra = b''
+            version = 20
+            if len(zip64) > 0:
+                extra = struct.pack(f'<HH{len(zip64)}Q', 1, 8 * len(zip64), *zip64)
+                version = 45
+
+            self.f.write(struct.pack('<LBBHHHHHLLLHHHHHLL', 0x02014b50, version, 3, version, flags, method,
+                                     self.dos_time, self.dos_date, crc, compress_size, file_size,
+                                     len(name), len(extra), 0, 0, 0, external_attr, offset))
+            self.f.write(name)
+            self.f.write(extra)
+
+        end = self.f.tell()
+        count = len(self.entries)
+        size = end - start
+
+        if count > ZIP64_COUNT_LIMIT or size > ZIP64_LIMIT or start > ZIP64_LIMIT:
+            self.f.write(struct.pack('<LQHHLLQQQQ', 0x06064b50, 44, 45, 45, 0, 0, count, count, size, start))
+            self.f.write(struct.pack('<LLQL', 0x07064b50, 0, end, 1))
+
+            #the regular record points at the zip64 one
+            count = min(count, 0xFFFF)
+            size = min(size, 0xFFFFFFFF)
+            start = min(start, 0xFFFFFFFF)
+
+        self.f.write(struct.pack('<LHHHHLLH', 0x06054b50, 0, 0, count, count, size, start, 0))
+        self.f.close()
+
+    # close the file without finishing the archive
+    def discard(self):
+        self.f.close()
+
+# write a '<file>.sha1' file next to the given file, in the same
+#   format as sha1sum, and return the hash
+def publish_sha1(path: str) -> str:
+    digest = hash_file(path)
+
+    with open(path + Constants.SHA1_SUFFIX, 'w', encoding='utf-8') as f:
+        f.write(f"{digest}  {os.path.basename(path)}\n")
+
+    return digest
+
+# print a summary of how well each file type compressed
+def print_zip_stats(zip_name: str, stats: dict):
+    print(f"Compression summary for {zip_name}:")
+
+    for ext in sorted(stats):
+        count, raw, packed = stats[ext]
+        ratio = (packed / raw * 100) if raw > 0 else 100
+
+        print(f"  {ext or '(none)'}: {count} files, {raw} -> {packed} bytes ({ratio:.1f}%)")
+
+
+
+# Streams every pack file straight into a .zip archive, so the
+#   pack folder never has to be written, walked, and deleted
+# Already-compressed media is stored as-is and streamed from disk in
+#   blocks. Everything else is deflated on a pool of threads while
+#   earlier members are written, with at most ZIP_WINDOW members
+#   compressed ahead, so compressed data never piles up in memory
+# The archive is reproducible: members are added sorted by path with
+#   fixed headers, so regenerating an unchanged pack gives the exact
+#   same file and SHA-1, and players don't have to download it again
+# The archive is written under a temporary name and renamed over
+#   the old .zip once it's complete
+class ZipPackWriter(VirtualPackWriter):
+    def __init__(self, pack_name: str, pretty: bool = False):
+        super().__init__(pack_name, pretty)
+
+        self.zip_name = self.root + Constants.ZIP_SUFFIX
+        self.tmp_name = self.staging_path(Constants.ZIP_SUFFIX)
+        self.zip = None
+        self.pool = None
+        self.pending = []
+        self.stats = {}
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+
+        #surface I/O errors from inside the archive as a zip failure
+        if exc_type is not None and issubclass(exc_type, OSError) \
+           and not issubclass(exc_type, FileExistsError):
+            raise IMDException(Status.BAD_ZIP) from exc_value
+
+        return False
+
+    def open(self):
+        self.check_folder()
+        self.remove_leftovers()
+
+        try:
+            self.zip = ZipArchive(self.tmp_name)
+
+        except OSError:
+            raise IMDException(Status.BAD_ZIP)
+
+        self.pool = ThreadPoolExecutor()
+
+    def close(self):
+        try:
+            with self.lock:
+                self.write_members()
+            self.zip.close()
+
+            #replace the old zip in one step
+            os.replace(self.tmp_name, self.zip_name)
+            digest = publish_sha1(self.zip_name)
+
+        except OSError:
+            self.abort()
+            raise IMDException(Status.BAD_ZIP)
+
+        self.pool.shutdown()
+
+        #a pack folder left over from a previous generation would
+        #  show up in-game next to the new .zip
+        try:
+            self.remove_folder()
+
+        except FileExistsError:
+            raise
+
+        except OSError:
+            print(f"Warning: Couldn't remove the old {self.pack_name} folder. Is something else using it?")
+
+        print_zip_stats(os.path.basename(self.zip_name), self.stats)
+        print(f"SHA-1 of {os.path.basename(self.zip_name)}: {digest}")
+
+    def abort(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+        #remove bad zip, if it exists. The old zip is left alone
+        try:
+            self.zip.discard()
+        except (OSError, AttributeError):
+            pass
+
+        if os.path.exists(self.tmp_name):
+            os.remove(self.tmp_name)
+
+    #zip archives always use '/' as a separator
+    def arcname(self, path: str) -> str:
+        return '/'.join(path.split(os.sep))
+
+    def write_text(self, path: str, text: str):
+        data = text.encode('utf-8')
+
+        with self.lock:
+            self.pending.append((self.arcname(path), data, False, ZIP_DEFLATED))
+
+    def copy_file(self, path: str, src: str, move: bool = False):
+        ext = os.path.splitext(path)[1].lower()
+
+        #media is already compressed, so store it
+        if ext in Constants.ZIP_STORED_EXTS:
+            method = ZIP_STORED
+        else:
+            method = ZIP_DEFLATED
+
+        #fail now, not when the file is finally read
+        if not os.path.isfile(src):
+            raise FileNotFoundError(src)
+
+        with self.lock:
+            self.pending.append((self.arcname(path), src, move, method))
+
+    # add every member to the archive, sorted by path
+    # must be called with self.lock held
+    def write_members(self):
+        self.pending.sort(key=lambda m: m[0])
+
+        for (arcname, src, move, method), job in self.compress_ahead():
+            if job is None:
+                self.zip.add_file(arcname, src)
+                size = packed = os.path.getsize(src)
+            else:
+                method, data, crc, size = job.result()
+                self.zip.add_bytes(arcname, method, data, crc, size)
+                packed = len(data)
+
+            if move:
+                os.remove(src)
+
+            self.add_stats(arcname, size, packed)
+
+        self.pending = []
+
+    # go through the pending members in order, with the members to be
+    #   deflated submitted to the pool up to ZIP_WINDOW members ahead
+    def compress_ahead(self):
+        window = collections.deque()
+
+        for member in self.pending:
+            arcname, src, move, method = member
+
+            job = None
+            if method == ZIP_DEFLATED:
+                job = self.pool.submit(deflate_member, src, Constants.ZIP_DEFLATE_LEVEL)
+
+            window.append((member, job))
+
+            if len(window) >= Constants.ZIP_WINDOW:
+                yield window.popleft()
+
+        while len(window) > 0:
+            yield window.popleft()
+
+    def add_stats(self, arcname: str, raw: int, packed: int):
+        ext = os.path.splitext(arcname)[1].lower()
+        count, total_raw, total_packed = self.stats.get(ext, (0, 0, 0))
+        self.stats[ext] = (count + 1, total_raw + raw, total_packed + packed)
+
+
+
+def get(pack_name: str, user_settings: dict) -> VirtualPackWriter:
+    pretty = user_settings.get('pretty_json', False)
+
+    if user_settings.get('zip', False):
+        return ZipPackWriter(pack_name, pretty)
+    else:
+        return FolderPackWriter(pack_name, pretty)